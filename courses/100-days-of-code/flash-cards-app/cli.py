@@ -0,0 +1,114 @@
+import csv
+import os.path as osp
+import sys
+from argparse import ArgumentParser
+import model
+from engine import Engine
+
+
+# Batch operations over the projects, without Tk nor PIL
+# python cli.py stats|export|rescore|review ...
+
+
+def check_names(projects: model.ProjectIndex, names: list[str]) -> list[str]:
+    for name in names:
+        if name not in projects:
+            sys.exit('No project named "%s".' %name)
+    return names or sorted(projects)
+
+def print_progress(progress: dict[str, object]):
+    print('  Progress: %.1f%%' %progress['progress'])
+    last_studied = progress['last_studied']
+    print('  Last studied: %s' %(
+        model.NEVER if last_studied is None
+        else last_studied.strftime('%Y-%m-%d %H:%M')))
+    print('  Reviewed today: %d (%d learned)' %(
+        progress['today_revisions'], progress['today_learnings']))
+
+def stats(engine: Engine, args):
+    if not args.projects:
+        totals = engine.projects.totals()
+        print('%d projects, %d cards, %d due today' %(
+            totals['num_projects'], totals['num_cards'], totals['due']))
+        return print_progress(totals)
+    for name in check_names(engine.projects, args.projects):
+        progress = engine.projects[name].progress()
+        print('%s: %d cards, %d due today, %d this week' %(
+            name, len(engine.projects[name].cards),
+            progress['due_today'], progress['due_week']))
+        print_progress(progress)
+
+def export(engine: Engine, args):
+    # Same columns read_import() expects, TSV for .tsv and .tab files
+    name, = check_names(engine.projects, [args.project])
+    tabs = osp.splitext(args.file)[1].lower() in ('.tsv', '.tab')
+    with open(args.file, mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t' if tabs else ',')
+        writer.writerow(model.IMPORT_COLUMNS)
+        for card in engine.projects[name].cards.values():
+            writer.writerow((card.name, card.ftxt, card.btxt,
+                             card.fimg or '', card.bimg or ''))
+    print('%d cards exported to %s' %(
+        len(engine.projects[name].cards), args.file))
+
+def rescore(engine: Engine, args):
+    for name in check_names(engine.projects, args.projects):
+        scores = engine.projects.rescore(name)
+        print('%s: %d cards, mean score %.1f, top %d' %(
+            name, len(scores), sum(scores) / len(scores) if scores else 0,
+            max(scores, default=0)))
+
+def review(engine: Engine, args):
+    name, = check_names(engine.projects, [args.project])
+    engine.set_project(name)
+    scheduling = 'sm2' if args.sm2 else 'score'
+    card = engine.next_card(mode=args.mode, scheduling=scheduling)
+    reviewed = 0
+    while card is not None and reviewed != args.count:
+        print('\n[%s]\n%s' %(card.name, card.ftxt or card.fimg or '(empty)'))
+        if input('Press enter to flip, q to stop: ').strip() == 'q':
+            break
+        print(card.btxt or card.bimg or '(empty)')
+        answer = input('Did you know it? [y/n/q] ').strip().lower()
+        if answer == 'q':
+            break
+        engine.review(card.name, answer == 'y')
+        reviewed += 1
+        card = engine.next_card(card.name, args.mode, scheduling)
+    print('\n%d cards reviewed' %reviewed)
+    print_progress(engine.progress())
+
+def main(argv: list[str] = None):
+    parser = ArgumentParser(description='Flash cards batch operations.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    command = commands.add_parser(
+        'stats', help='progress of all or some projects')
+    command.add_argument('projects', nargs='*')
+    command.set_defaults(run=stats)
+    command = commands.add_parser(
+        'export', help='write the cards of a project to a CSV or TSV file')
+    command.add_argument('project')
+    command.add_argument('file')
+    command.set_defaults(run=export)
+    command = commands.add_parser(
+        'rescore', help='score the cards and rewrite the project summaries')
+    command.add_argument('projects', nargs='*')
+    command.set_defaults(run=rescore)
+    command = commands.add_parser('review', help='review cards in text mode')
+    command.add_argument('project')
+    command.add_argument(
+        '--mode', choices=('revision', 'quiz'), default='revision')
+    command.add_argument(
+        '--sm2', action='store_true', help='spaced repetition scheduling')
+    command.add_argument(
+        '--count', type=int, default=-1, help='cards to review at most')
+    command.set_defaults(run=review)
+    args = parser.parse_args(argv)
+    engine = Engine()
+    try:
+        args.run(engine, args)
+    finally:
+        engine.close()
+
+if __name__ == '__main__':
+    main()
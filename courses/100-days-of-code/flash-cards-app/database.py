@@ -0,0 +1,144 @@
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Union
+from json import loads
+
+
+
+CARD_COLUMNS = ('name', 'fimg', 'ftxt', 'bimg', 'btxt',
+                'creation', 'num_revisions', 'last_revision', 'learned',
+                'due', 'interval', 'ease')
+# Columns added after the first version, with their definition
+ADDED_COLUMNS = {'due': 'TEXT',
+                 'interval': 'INTEGER NOT NULL DEFAULT 0',
+                 'ease': 'REAL NOT NULL DEFAULT 2.5'}
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS project (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    name TEXT PRIMARY KEY,
+    fimg TEXT,
+    ftxt TEXT,
+    bimg TEXT,
+    btxt TEXT,
+    creation TEXT NOT NULL,
+    num_revisions INTEGER NOT NULL DEFAULT 0,
+    last_revision TEXT,
+    learned INTEGER NOT NULL DEFAULT 0,
+    due TEXT,
+    interval INTEGER NOT NULL DEFAULT 0,
+    ease REAL NOT NULL DEFAULT 2.5
+);
+CREATE INDEX IF NOT EXISTS cards_learned ON cards (learned);
+CREATE INDEX IF NOT EXISTS cards_last_revision ON cards (last_revision);
+CREATE INDEX IF NOT EXISTS cards_name ON cards (name COLLATE NOCASE);
+'''
+INSERT_CARD = 'INSERT OR REPLACE INTO cards (%s) VALUES (%s)' %(
+    ', '.join(CARD_COLUMNS), ', '.join('?' * len(CARD_COLUMNS)))
+
+
+
+# SQLite storage for a project: the project metadata is kept as a JSON
+# document and the cards as rows, so a single card can be read or updated
+# without touching the rest of the deck
+class CardDatabase:
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._add_columns()
+
+    def _add_columns(self):
+        # Databases created before a column existed
+        columns = {row[1] for row in
+                   self._conn.execute('PRAGMA table_info(cards)')}
+        with self._conn:
+            for column, definition in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute('ALTER TABLE cards ADD COLUMN %s %s'
+                                       %(column, definition))
+
+    @staticmethod
+    def _card_row(card_dict: dict[str, object]) -> tuple:
+        return tuple(card_dict[column] for column in CARD_COLUMNS)
+
+    @staticmethod
+    def _card_dict(row: tuple) -> dict[str, object]:
+        card_dict = dict(zip(CARD_COLUMNS, row))
+        card_dict['learned'] = bool(card_dict['learned'])
+        return card_dict
+
+    def read_project(self) -> dict[str, object]:
+        data, = self._conn.execute(
+            'SELECT data FROM project WHERE id = 0').fetchone()
+        project_dict = loads(data)
+        cursor = self._conn.execute(
+            'SELECT %s FROM cards' %', '.join(CARD_COLUMNS))
+        project_dict['cards'] = {
+            row[0]: self._card_dict(row) for row in cursor}
+        return project_dict
+
+    def write_project(
+            self, project_json: str, cards: Iterable[dict[str, object]]):
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO project (id, data) VALUES (0, ?)',
+                (project_json,))
+            self._conn.execute('DELETE FROM cards')
+            self._conn.executemany(INSERT_CARD, map(self._card_row, cards))
+
+    def revision_days(self) -> list[str]:
+        cursor = self._conn.execute(
+            'SELECT DISTINCT substr(last_revision, 1, 10) FROM cards '
+            'WHERE last_revision IS NOT NULL ORDER BY 1 DESC')
+        return [day for day, in cursor]
+
+    def _names(self, where: str, params: tuple = ()) -> set[str]:
+        cursor = self._conn.execute(
+            'SELECT name FROM cards WHERE %s' %where, params)
+        return {name for name, in cursor}
+
+    def names_by_learned(self, learned: bool) -> set[str]:
+        return self._names('learned = ?', (learned,))
+
+    def names_by_revision_day(self, day: Union[str, None]) -> set[str]:
+        if day is None:
+            return self._names('last_revision IS NULL')
+        # ISO dates sort as text, so a day is a range on the index
+        return self._names(
+            'last_revision >= ? AND last_revision < ?', (day, day + 'U'))
+
+    def names_by_prefix(self, prefix: str) -> set[str]:
+        prefix = prefix.replace('\\', '\\\\')
+        prefix = prefix.replace('%', '\\%').replace('_', '\\_')
+        return self._names(
+            "name LIKE ? ESCAPE '\\'", (prefix + '%',))
+
+    def apply_many(self, entries: Iterable[dict[str, object]]):
+        # Same entries a project writes to its journal, in one transaction
+        with self._conn:
+            for entry in entries:
+                self._apply(entry)
+
+    def _apply(self, entry: dict[str, object]):
+        if entry['op'] == 'review':
+            self._conn.execute(
+                'UPDATE cards SET num_revisions = num_revisions + 1, '
+                'last_revision = ?, learned = ?, '
+                'due = ?, interval = ?, ease = ? WHERE name = ?',
+                (entry['date'], entry['learned'], entry['due'],
+                 entry['interval'], entry['ease'], entry['card']))
+        elif entry['op'] == 'put':
+            if entry['old'] is not None:
+                self._conn.execute(
+                    'DELETE FROM cards WHERE name = ?', (entry['old'],))
+            self._conn.execute(INSERT_CARD, self._card_row(entry['card']))
+        elif entry['op'] == 'delete':
+            self._conn.execute(
+                'DELETE FROM cards WHERE name = ?', (entry['card'],))
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,63 @@
+from typing import Union
+import model
+from scheduler import Scheduler
+
+
+
+# Study session over the projects, without any user interface: the app
+# and the command line both drive one. Mode is 'revision' or 'quiz', and
+# scheduling is 'score' or 'sm2' (spaced repetition, revision mode only)
+class Engine:
+
+    def __init__(self, projects: model.ProjectIndex = None):
+        self.projects = (model.load_project_index()
+                         if projects is None else projects)
+        self.scheduler = Scheduler()
+        self.project = None
+
+    def set_project(self, name: str = None) -> Union[model.Project, None]:
+        self.project = None if name is None else self.projects[name]
+        self.scheduler.rebuild(
+            () if self.project is None else self.project.cards.values())
+        return self.project
+
+    def refresh_day(self) -> bool:
+        # Scores and "reviewed today" depend on the date
+        if not model.refresh_today():
+            return False
+        if self.project is not None:
+            self.scheduler.rebuild()
+        return True
+
+    def next_card(
+            self, exclude: str = None, mode: str = 'revision',
+            scheduling: str = 'score') -> Union[model.Card, None]:
+        if self.project is None:
+            return None
+        if mode == 'quiz':
+            return self.scheduler.sample(exclude)
+        if scheduling == 'sm2':
+            return self.project.next_due_card(exclude)
+        return self.scheduler.next_due(exclude)
+
+    def upcoming(self, count: int, exclude: str = None) -> list[model.Card]:
+        return self.scheduler.upcoming(count, exclude)
+
+    def review(self, name: str, learned: bool) -> tuple[model.Card, int]:
+        # Returns the card and its new position in the score order
+        card = self.project.review_card(name, learned)
+        _, idx = self.scheduler.update(card)
+        return (card, idx)
+
+    def know(self, name: str) -> tuple[model.Card, int]:
+        return self.review(name, True)
+
+    def dont_know(self, name: str) -> tuple[model.Card, int]:
+        return self.review(name, False)
+
+    def progress(self) -> Union[dict[str, object], None]:
+        return None if self.project is None else self.project.progress()
+
+    def close(self):
+        for project in self.projects.loaded():
+            project.close()
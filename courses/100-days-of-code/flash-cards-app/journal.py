@@ -0,0 +1,104 @@
+import os
+import os.path as osp
+from pathlib import Path
+from typing import Iterable, Iterator, Union
+from json import dumps, loads, JSONDecodeError
+
+
+
+# Append-only log of the changes made to a project since its last snapshot
+# Each line is a JSON object with a sequence number, an operation and its data
+# The active file is rotated before a compaction folds it into the snapshot
+class Journal:
+
+    def __init__(self, path: Union[str, Path], seq: int = 0):
+        self.path = Path(path)
+        self.rotated_path = self.path.with_suffix('.rotated')
+        self.seq = seq
+        self.size = 0  # Entries in the active file
+        self._file = None
+
+    def extend(self, op: str, datas: Iterable[dict]):
+        # Several entries of the same operation, flushed together
+        if self._file is None:
+            self._file = open(self.path, mode='a', encoding='utf-8')
+        for data in datas:
+            self.seq += 1
+            self._file.write(
+                dumps({'seq': self.seq, 'op': op, **data}) + '\n')
+            self.size += 1
+        self._file.flush()
+
+    @staticmethod
+    def read(path: Union[str, Path], after: int = 0) -> Iterator[dict]:
+        try:
+            journal_file = open(path, mode='r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with journal_file:
+            for line in journal_file:
+                try:
+                    entry = loads(line)
+                except JSONDecodeError:
+                    continue  # Incomplete write, probably a crash
+                if entry['seq'] > after:
+                    yield entry
+
+    def replay(self, after: int = 0) -> Iterator[dict]:
+        for path in (self.rotated_path, self.path):
+            for entry in self.read(path, after):
+                self.seq = max(self.seq, entry['seq'])
+                if path == self.path:
+                    self.size += 1
+                yield entry
+
+    def sync(self):
+        # Flushed entries may still be in the OS buffers
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    @staticmethod
+    def sync_path(path: Union[str, Path]):
+        # Same, through a descriptor of its own, so it can run in another
+        # thread while entries are appended. A rotated journal is skipped,
+        # its compaction writes it to the snapshot
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rotate(self) -> bool:
+        self.close()
+        if not osp.isfile(self.path):
+            return osp.isfile(self.rotated_path)
+        if osp.isfile(self.rotated_path):
+            # Previous compaction didn't finish, keep the older entries
+            with (open(self.rotated_path, mode='a', encoding='utf-8') as dst,
+                  open(self.path, mode='r', encoding='utf-8') as src):
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+        self.size = 0
+        return True
+
+    def discard_rotated(self):
+        try: os.remove(self.rotated_path)
+        except FileNotFoundError: pass
+
+    def clear(self):
+        self.close()
+        for path in (self.path, self.rotated_path):
+            try: os.remove(path)
+            except FileNotFoundError: pass
+        self.size = 0
+
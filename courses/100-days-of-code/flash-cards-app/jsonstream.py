@@ -0,0 +1,103 @@
+import re
+from typing import IO, Iterator
+from json import JSONDecoder, JSONDecodeError
+
+
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Fast paths of `members()`, if they fail the buffer is probably exhausted
+COLON = re.compile(r'[ \t\n\r]*:[ \t\n\r]*')
+SEPARATOR = re.compile(r'[ \t\n\r]*([,}])[ \t\n\r]*')
+SCANNER = JSONDecoder().scan_once  # What `raw_decode` uses
+# Characters a number may go on with, e.g. after '-1.' or '1.5e'
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+
+# Incremental reader of a JSON document, for files too big to be decoded at
+# once. Objects are walked member by member with `members()`, any other
+# value is decoded whole with `value()`. Only the unread part of the file
+# is buffered, plus the value being decoded
+class JSONStream:
+
+    def __init__(self, file: IO[str]):
+        self._file = file
+        self._buf = ''
+        self._pos = 0
+
+    def _more(self) -> bool:
+        # Reads at least as much as is buffered, so decoding a big value
+        # retries a logarithmic number of times
+        chunk = self._file.read(max(CHUNK_SIZE, len(self._buf) - self._pos))
+        if not chunk:
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        # Next non whitespace character, empty at the end of the file
+        while True:
+            self._pos = WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._more():
+                return ''
+
+    def _expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise JSONDecodeError(
+                'Expecting %s' %' or '.join(map(repr, chars)),
+                self._buf, self._pos)
+        self._pos += 1
+        return char
+
+    def value(self) -> object:
+        if self._pos >= len(self._buf) or self._buf[self._pos] in ' \t\n\r':
+            self.peek()
+        while True:
+            try:
+                value, end = SCANNER(self._buf, self._pos)
+            except (JSONDecodeError, StopIteration) as error:
+                if self._more():
+                    continue
+                if isinstance(error, StopIteration):
+                    raise JSONDecodeError(
+                        'Expecting value', self._buf, self._pos) from None
+                raise
+            if (self._buf[self._pos] in '-0123456789'
+                    and NUMBER_TAIL.match(self._buf, end).end()
+                        == len(self._buf)
+                    and self._more()):
+                continue  # The number may go on in the next chunk
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        # Yields the keys of an object, the caller must read each value
+        # (with `value()` or `members()`) before asking for the next key
+        self._expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            if not self._buf.startswith('"', self._pos):
+                if self.peek() != '"':
+                    self._expect('"')
+            key = self.value()
+            match = COLON.match(self._buf, self._pos)
+            if match is None or match.end() == len(self._buf):
+                self._expect(':')
+            else:
+                self._pos = match.end()
+            yield key
+            match = SEPARATOR.match(self._buf, self._pos)
+            if match is None or match.end() == len(self._buf):
+                separator = self._expect(',}')
+            else:
+                separator = match.group(1)
+                self._pos = match.end()
+            if separator == '}':
+                return
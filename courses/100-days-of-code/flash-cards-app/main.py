@@ -1,71 +1,139 @@
 import model
+from engine import Engine
 from views.app import *
-import random
-
-
-PROJECTS = model.load_projects()
-CARDS = None
+from functools import partial
+import csv
+
+
+ENGINE = Engine(model.load_project_index(wait=False))
+PROJECTS = ENGINE.projects
+SCHEDULER = ENGINE.scheduler
+# Projects without summary are parsed in the background, started before Tk
+LOADER = model.ProjectLoader(PROJECTS.missing)
+FILTER = None  # Names of the cards matching the cards list filter
+LISTED = None  # Cards matching the filter, in the list order
+VIRTUAL_LIST_SIZE = 2000  # Bigger projects only list the visible cards
+PREFETCH = 3  # Number of upcoming cards which images are preloaded
+AUTOSAVE_TICK = 5000  # Milliseconds between checks for projects to save
 POPUP = None
 APP = App()
+INGESTOR = model.ImageIngestor(lambda poll: APP.root.after(50, poll))
 
 
 ### Main window
 def save_and_close():
-    for project in PROJECTS.values():
-        project.save()
+    # The window stays up, showing it is saving, until everything is saved
+    APP.show_saving()
+    INGESTOR.shutdown()
+    LOADER.shutdown()
+    ENGINE.close()
     APP.root.destroy()
 
+def check_day():
+    if ENGINE.refresh_day():
+        project = APP.projects.get_working_project()
+        if project is not None:
+            set_project(project)
+    APP.root.after(60000, check_day)
+
+def autosave():
+    # Projects decide when their changes are due to be saved
+    for project in PROJECTS.loaded():
+        if project.autosave():
+            PROJECTS.summaries[project.name] = project.summary()
+    APP.root.after(AUTOSAVE_TICK, autosave)
+
 APP.bind(VEV_CLOSE_APP, save_and_close)
+APP.root.after(60000, check_day)
+APP.root.after(AUTOSAVE_TICK, autosave)
+model.TRASH.purge_in_background()
 
 
 ### Projects
+def receive_projects():
+    # The projects list is built on demand, so it grows as projects arrive
+    for project in LOADER.finished():
+        if project.name not in PROJECTS:
+            PROJECTS.add_missing(project)
+    if LOADER.pending():
+        APP.root.after(100, receive_projects)
+
+if LOADER.pending():
+    APP.root.after(100, receive_projects)
+
 APP.projects.set_post_command(lambda : tuple(PROJECTS.keys()))
 
 def delete_project(name):
-    global CARDS
-    PROJECTS[name].save()  # In case user wants to restore from trash
-    PROJECTS[name].delete()
-    del PROJECTS[name]
-    CARDS = None
+    PROJECTS.delete(name)
+    model.TRASH.purge_in_background()
+    ENGINE.set_project()
     APP.projects.set_working_project()
+    APP.projects.set_restorable()
+
+def restore_project():
+    entry = model.last_trashed()
+    if entry is not None:
+        try:
+            project = PROJECTS.restore(entry)
+        except OSError as error:
+            APP.projects.report(
+                "Restore", "Couldn't restore the project: %s" %error)
+        else:
+            APP.projects.set_working_project(project.name)
+    APP.projects.set_restorable(model.last_trashed() is not None)
 
 def create_project(name):
     name = model.Project.check_name(name)
+    if name and name not in PROJECTS and model.project_dir(name).exists():
+        # Project still being loaded, or a folder like the trash
+        return APP.projects.report(
+            "New project", 'The name "%s" is already in use.' %name)
     if name and name not in PROJECTS:
         PROJECTS[name] = model.Project(name)
+        PROJECTS[name].save()
         APP.projects.set_working_project(name)
 
 def none_project():
+    global FILTER, LISTED
+    FILTER = LISTED = None
+    ENGINE.set_project()
     APP.progress.reset()
     APP.mode.set_default()
     APP.cards.remove_all_cards()
     APP.cards.set_working_card()
 
 def set_project(name):
-    global CARDS
-    project = PROJECTS[name]
-    sorted_cards = sorted(
-        project.cards.values(), key=(lambda c: c.score()), reverse=True)
+    global FILTER, LISTED
+    project = ENGINE.set_project(name)
+    shown = APP.cards.get_working_card()  # Not shown again when reloading
+    FILTER = LISTED = None
     APP.cards.remove_all_cards()
-    APP.cards.extend_cards(
-        [c.name for c in sorted_cards], [c.score() for c in sorted_cards])
-    CARDS = sorted_cards
+    if len(SCHEDULER) > VIRTUAL_LIST_SIZE:
+        APP.cards.set_source(count_listed, listed_rows, listed_index)
+    else:
+        APP.cards.extend_cards(
+            [c.name for c in SCHEDULER], [c.score() for c in SCHEDULER])
+    APP.cards.set_filter_categories(model.FILTER_CATEGORIES)
     update_progress(project)
-    next_card()
+    next_card(shown or "")
 
 def update_progress(project=None):
-    progress = (
-        get_project().progress() if project is None else project.progress())
-    APP.progress.set_progress(progress['progress'])
-    APP.progress.set_last_studied(
-        model.str_from_datetime(progress['last_studied']))
-    APP.progress.set_today_revisions(progress['today_revisions'])
-    APP.progress.set_today_learnings(progress['today_learnings'])
+    if project is None:
+        name = APP.projects.get_working_project()
+        if name is None:
+            return  # Project closed before a deferred update
+        project = PROJECTS[name]
+    progress = project.progress()
+    progress['last_studied'] = model.str_from_datetime(
+        progress['last_studied'])
+    APP.progress.update(progress)
 
 APP.bind(VEV_PROJ_CREATE, create_project, ("%d",))
 APP.bind(VEV_PROJ_DELETE, delete_project, ("%d",))
 APP.bind(VEV_PROJ_SET, set_project, ("%d",))
 APP.bind(VEV_PROJ_NONE, none_project)
+APP.bind(VEV_PROJ_RESTORE, restore_project)
+APP.projects.set_restorable(model.last_trashed() is not None)
 
 
 ### Cards
@@ -78,14 +146,19 @@ def set_card(name):
     APP.viewer.card.set_content(
         name, card.fimg, card.ftxt, card.bimg, card.btxt)
     APP.viewer.card.enable_buttons('flip')
+    if (APP.mode.get_mode() == 'revision'
+            and APP.mode.get_scheduling() == 'score'):
+        APP.viewer.card.prefetch(
+            [img for c in ENGINE.upcoming(PREFETCH, name)
+             for img in (c.fimg, c.bimg)])
 
 def delete_card(name):
-    del get_project().cards[name]
-    for i, c in enumerate(CARDS):
-        if c.name == name:
-            CARDS.pop(i)
-            break
-    APP.cards.remove_card(name)
+    get_project().remove_card(name)
+    SCHEDULER.remove(name)
+    if FILTER is None:
+        APP.cards.remove_card(name)
+    else:
+        APP.defer('cards', filter_cards)
     APP.cards.set_working_card()
 
 def none_card():
@@ -111,7 +184,6 @@ def card_popup_conclude():
         create_card_conclude()
     else:
         edit_card_conclude()
-    update_progress()
 
 def card_popup_cancel():
     global POPUP
@@ -119,7 +191,6 @@ def card_popup_cancel():
     POPUP = None
 
 def create_card_conclude():
-    global POPUP
     project = get_project()
     name, learned, fimg, ftxt, bimg, btxt = POPUP.get_content()
     # Valid content
@@ -132,24 +203,41 @@ def create_card_conclude():
         return POPUP.warning("Nonexistent or unsupported file for front image.")
     if bimg and not model.check_image(bimg):
         return POPUP.warning("Nonexistent or unsupported file for back image.")
-    # Process images
-    if fimg: fimg = model.process_image(fimg, project.imgs_dir)
-    if bimg: bimg = model.process_image(bimg, project.imgs_dir)
+    # Process images in the background
+    POPUP.set_pending()
+    INGESTOR.submit(
+        (fimg, bimg), project.imgs_dir,
+        partial(create_card_finish, POPUP, project, name, learned,
+                model.clear_whitespaces(ftxt), model.clear_whitespaces(btxt)))
+
+def create_card_finish(popup, project, name, learned, ftxt, btxt, images):
+    global POPUP
+    if POPUP is not popup:
+        return  # Popup closed while processing the images
+    if project is not ENGINE.project:
+        return card_popup_cancel()  # Project changed meanwhile
+    if None in images:
+        POPUP.set_pending(False)
+        return POPUP.warning("Couldn't process the card images.")
+    if name in project.cards:
+        POPUP.set_pending(False)
+        return POPUP.warning("A card with the same name already exists.")
+    fimg, bimg = images
     # Create card
-    card = model.Card(
-        name, fimg, model.clear_whitespaces(ftxt),
-        bimg, model.clear_whitespaces(btxt), learned=learned)
-    project.cards[name] = card
-    idx = model.insert_card(card, CARDS)
-    APP.cards.insert_card(card.name, card.score(), idx)
+    card = model.Card(name, fimg, ftxt, bimg, btxt, learned=learned)
+    project.add_card(card)
+    idx = SCHEDULER.insert(card)
+    if FILTER is None:
+        APP.cards.insert_card(card.name, card.score(), idx)
+    else:
+        APP.defer('cards', filter_cards)
     POPUP.close()
     POPUP = None
+    APP.defer('progress', update_progress)
 
 def edit_card_conclude():
-    global POPUP
     original_name = POPUP.card_original_name
     project = get_project()
-    card = project.cards[original_name]
     name, learned, fimg, ftxt, bimg, btxt = POPUP.get_content()
     # Valid content
     name = model.clear_whitespaces(name)
@@ -161,63 +249,160 @@ def edit_card_conclude():
         return POPUP.warning("Nonexistent or unsupported file for front image.")
     if bimg and not model.check_image(bimg):
         return POPUP.warning("Nonexistent or unsupported file for back image.")
-    # Process images
-    if fimg: fimg = model.process_image(fimg, project.imgs_dir)
-    if bimg: bimg = model.process_image(bimg, project.imgs_dir)
+    # Process images in the background
+    POPUP.set_pending()
+    INGESTOR.submit(
+        (fimg, bimg), project.imgs_dir,
+        partial(edit_card_finish, POPUP, project, original_name, name,
+                learned, model.clear_whitespaces(ftxt),
+                model.clear_whitespaces(btxt)))
+
+def edit_card_finish(
+        popup, project, original_name, name, learned, ftxt, btxt, images):
+    global POPUP
+    if POPUP is not popup:
+        return  # Popup closed while processing the images
+    if project is not ENGINE.project or original_name not in project.cards:
+        return card_popup_cancel()  # Project changed or card deleted
+    if None in images:
+        POPUP.set_pending(False)
+        return POPUP.warning("Couldn't process the card images.")
+    if name != original_name and name in project.cards:
+        POPUP.set_pending(False)
+        return POPUP.warning("A card with the same name already exists.")
+    fimg, bimg = images
     # Edit card
-    card.name = name
-    card.learned = learned
-    card.fimg = fimg
-    card.ftxt = model.clear_whitespaces(ftxt)
-    card.bimg = bimg
-    card.btxt = model.clear_whitespaces(btxt)
+    card = project.update_card(
+        original_name, name=name, learned=learned,
+        fimg=fimg, ftxt=ftxt, bimg=bimg, btxt=btxt)
+    _, idx = SCHEDULER.update(card, original_name)
+    if FILTER is not None:
+        APP.defer('cards', filter_cards)
+    elif name != original_name:
+        APP.cards.remove_card(original_name)
+        APP.cards.insert_card(card.name, card.score(), idx)
+    else:
+        APP.cards.move_card(card.name, card.score(), idx)
+    if name != original_name:
+        APP.cards.set_working_card(card.name)
     POPUP.close()
     POPUP = None
+    APP.defer('progress', update_progress)
 
 def know_card(name):
-    card = get_project().cards[name]
-    card.register_review(True)
-    update_progress()
-    next_card()
+    review_card(name, True)
 
 def dknow_card(name):
-    card = get_project().cards[name]
-    card.register_review(False)
-    update_progress()
-    next_card()
+    review_card(name, False)
+
+def review_card(name, learned):
+    card, idx = ENGINE.review(name, learned)
+    if FILTER is None:
+        APP.cards.move_card(name, card.score(), idx)
+    else:
+        APP.defer('cards', filter_cards)
+    APP.defer('progress', update_progress)
+    next_card(name)
 
 def flip_handler():
     APP.viewer.enable_buttons()
     APP.viewer.card.enable_buttons()
 
-def filter_cards():
+def import_cards(file_path):
+    name = APP.projects.get_working_project()
+    if name is None:
+        return APP.cards.report("Import", "Select a project first.")
+    project = PROJECTS[name]
+    try:
+        rows, errors = model.read_import(file_path, project.cards)
+    except (OSError, UnicodeDecodeError, csv.Error) as error:
+        return APP.cards.report("Import", "Couldn't read the file: %s" %error)
+    # Every image once, all of them processed in parallel
+    images = list({img for row in rows for img in (row[1], row[3]) if img})
+    APP.cards.set_importing()
+    INGESTOR.submit(
+        images, project.imgs_dir,
+        partial(import_cards_finish, project, rows, images, errors))
+
+def import_cards_finish(project, rows, images, errors, processed):
+    APP.cards.set_importing(False)
+    if project.name not in PROJECTS:
+        return  # Project deleted during the import
+    stored = dict(zip(images, processed))
+    stored[''] = ''
+    cards = []
+    for name, fimg, ftxt, bimg, btxt in rows:
+        fimg, bimg = stored[fimg], stored[bimg]
+        if fimg is None or bimg is None:
+            errors.append('Card "%s": couldn\'t process its images.' %name)
+        elif name in project.cards:
+            errors.append('Card "%s": created during the import.' %name)
+        else:
+            cards.append(model.Card(name, fimg, ftxt, bimg, btxt))
+    # All cards at once, then a single sort and list refresh
+    project.add_cards(cards)
+    if APP.projects.get_working_project() == project.name:
+        set_project(project.name)
+    message = "%d cards imported." %len(cards)
+    if errors:
+        message += "\n\n%d rows skipped:\n%s" %(
+            len(errors), '\n'.join(errors[:10]))
+        if len(errors) > 10:
+            message += "\n..."
+    APP.cards.report("Import", message)
+
+def list_cards():
+    global LISTED
+    LISTED = (None if FILTER is None
+              else [c for c in SCHEDULER if c.name in FILTER])
+    if APP.cards.is_virtual():
+        APP.cards.show_card(APP.cards.get_working_card())
+        return APP.cards.refresh()
+    cards = SCHEDULER if LISTED is None else LISTED
+    APP.cards.set_cards([c.name for c in cards], [c.score() for c in cards])
+
+def count_listed():
+    return len(SCHEDULER if LISTED is None else LISTED)
+
+def listed_rows(start, stop):
+    cards = SCHEDULER if LISTED is None else LISTED
+    return [(c.name, c.score()) for c in cards[start:stop]]
+
+def listed_index(name):
+    if LISTED is None:
+        return SCHEDULER.index(name) if name in SCHEDULER else None
+    for idx, card in enumerate(LISTED):
+        if card.name == name:
+            return idx
     return None
 
+def filter_cards():
+    global FILTER
+    project = APP.projects.get_working_project()
+    category = APP.cards.get_filter_category()
+    value = APP.cards.get_filter_value()
+    if project is not None and category and value:
+        FILTER = PROJECTS[project].filter_cards(category, value)
+    else:
+        FILTER = None
+    list_cards()
+
 def update_filter_values():
-    return None
+    global FILTER
+    project = APP.projects.get_working_project()
+    category = APP.cards.get_filter_category()
+    if project is None or not category:
+        return APP.cards.set_filter_values([])
+    APP.cards.set_filter_values(PROJECTS[project].filter_values(category))
+    if FILTER is not None:
+        FILTER = None
+        list_cards()
 
 def next_card(actual_card=""):
-    nxt = None
-    if APP.mode.get_mode() == 'revision':
-        for c in CARDS:
-            if c.learned:
-                continue
-            if c.name != actual_card and c.last_revision is None:
-                nxt = c
-                break
-            if c.name != actual_card and c.last_revision.date() < model.TODAY:
-                nxt = c
-                break
-        else:
-            return APP.cards.set_working_card()
-    else:
-        try:
-            while True:
-                nxt = random.choice(CARDS)
-                if nxt.name != actual_card:
-                    break
-        except IndexError:
-            return APP.cards.set_working_card()
+    nxt = ENGINE.next_card(
+        actual_card, APP.mode.get_mode(), APP.mode.get_scheduling())
+    if nxt is None:
+        return APP.cards.set_working_card()
     return APP.cards.set_working_card(nxt.name)
 
 APP.bind(VEV_CARD_SET, set_card, ("%d",))
@@ -228,6 +413,7 @@ APP.bind(VEV_CARD_EDIT, edit_card)
 APP.bind(VEV_CARD_FLIPPED, flip_handler)
 APP.bind(VEV_CARDS_FILTERING, filter_cards)
 APP.bind(VEV_FILTER_CATEG_SET, update_filter_values)
+APP.bind(VEV_CARDS_IMPORT, import_cards, ("%d",))
 APP.bind(VEV_CARD_POPUP_CONCLUDE, card_popup_conclude)
 APP.bind(VEV_CARD_POPUP_CANCEL, card_popup_cancel)
 APP.bind(VEV_KNOW_CARD, know_card, ("%d", ))
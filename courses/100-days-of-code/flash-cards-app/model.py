@@ -1,13 +1,27 @@
 import os
 import os.path as osp
+import sys
+import csv
 import shutil
-from datetime import datetime
-from typing import Union
-from dataclasses import dataclass, field, asdict
+import hashlib
+import multiprocessing
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Iterator, Union
+from collections import Counter
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from json import load, dump
+from json import load, dump, dumps
 from string import ascii_letters, digits
-from PIL import Image
+from threading import Thread, get_ident
+from time import monotonic
+from concurrent.futures import (
+    ThreadPoolExecutor, ProcessPoolExecutor, as_completed)
+from journal import Journal
+from jsonstream import JSONStream
+from database import CardDatabase
+from search import SearchIndex, tokenize
+from trash import Trash, TrashEntry
 
 
 
@@ -17,20 +31,60 @@ DATE_FMT = '%m-%d-%Y %H:%M:%S.%f'
 VALID_CHARS = frozenset(''.join((ascii_letters, digits, ' -_')))
 TODAY = datetime.now().date()
 IMG_FMTS = ('.png', '.jpg', '.gif', '.jpeg', '.tiff')
-IMG_LIMITS = (450, 300)
+IMG_LIMITS = (450, 300)  # Main image, the one shown by the card viewer
+IMG_VARIANTS = {'thumb': (150, 100), 'full': (1800, 1200)}
+JOURNAL_COMPACT_SIZE = 500  # Journal entries that trigger a compaction
+AUTOSAVE_DELAY = 10  # Seconds without changes before a project is saved
+AUTOSAVE_MAX_DELAY = 120  # Longest a change waits to be saved
+SQLITE_MIGRATION_SIZE = 20000  # JSON projects bigger than this use SQLite
+FILTER_CATEGORIES = ('Name', 'Text', 'Learned', 'Last revision')
+IMPORT_COLUMNS = ('name', 'front', 'back', 'front image', 'back image')
+# SM-2 answer quality (0 to 5) of "I know" and "I don't know"
+SM2_QUALITY = {True: 4, False: 2}
+SM2_MIN_EASE = 1.3
+NEVER = 'Never'
 
 try: os.mkdir(PROJECTS_DIR)
 except FileExistsError: pass
 
+TRASH = Trash(PROJECTS_DIR / 'trash',
+              release=lambda folder: release_images(folder))
+# Compactions still running, by project folder. Closing a project doesn't
+# wait for them, loading it again does
+COMPACTIONS: dict[Path, Thread] = {}
 
 
+
+def refresh_today() -> bool:
+    global TODAY
+    today = datetime.now().date()
+    if today == TODAY:
+        return False
+    TODAY = today  # Invalidates the cached scores
+    return True
+
 def datetime_from_str(date: str) -> datetime:
     return datetime.strptime(date, DATE_FMT)
 
 def str_from_datetime(date: datetime) -> str:
     return date.strftime(DATE_FMT)
 
-@dataclass
+# Dates are stored in ISO 8601, which `fromisoformat` parses way faster
+# than `strptime`. Files saved with the old DATE_FMT are still readable and
+# get migrated the next time their snapshot is written
+def is_legacy_date(date: str) -> bool:
+    return date[2] == '-'  # MM-DD-YYYY ...
+
+def decode_datetime(date: str) -> datetime:
+    if is_legacy_date(date):
+        return datetime_from_str(date)
+    return datetime.fromisoformat(date)
+
+def encode_datetime(date: datetime) -> str:
+    return date.isoformat(timespec='microseconds')
+
+# Slotted, projects may hold hundreds of thousands of cards
+@dataclass(slots=True)
 class Card:
 
     name: str
@@ -42,29 +96,83 @@ class Card:
     num_revisions: int = 0
     last_revision: datetime = None
     learned: bool = False
+    # Spaced repetition (SM-2) state, a new card is due right away
+    due: date = None
+    interval: int = 0  # Days
+    ease: float = 2.5
+    # (TODAY, score) pair, reset whenever the card metadata changes
+    _score_cache: tuple[object, int] = field(
+        default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Cards sharing an image share its path (None in old projects)
+        if isinstance(self.fimg, str):
+            self.fimg = sys.intern(self.fimg)
+        if isinstance(self.bimg, str):
+            self.bimg = sys.intern(self.bimg)
 
     @staticmethod
     def parse_card_dict(card_dict: dict[str, object]) -> dict[str, object]:
-        card_dict['creation'] = datetime_from_str(card_dict['creation'])
+        card_dict['creation'] = decode_datetime(card_dict['creation'])
         if card_dict['last_revision'] is not None:
-            card_dict['last_revision'] = datetime_from_str(
+            card_dict['last_revision'] = decode_datetime(
                 card_dict['last_revision'])
+        if card_dict.get('due') is not None:
+            card_dict['due'] = date.fromisoformat(card_dict['due'])
 
     @classmethod
     def from_dict(cls, card_dict: dict[str, object]) -> 'Card':
         cls.parse_card_dict(card_dict)
         return Card(**card_dict)
 
+    def to_dict(self) -> dict[str, object]:
+        # Built by hand, asdict() would add the score cache and deep copy
+        # every value
+        return {'name': self.name,
+                'fimg': self.fimg,
+                'ftxt': self.ftxt,
+                'bimg': self.bimg,
+                'btxt': self.btxt,
+                'creation': encode_datetime(self.creation),
+                'num_revisions': self.num_revisions,
+                'last_revision': (None if self.last_revision is None
+                                  else encode_datetime(self.last_revision)),
+                'learned': self.learned,
+                'due': None if self.due is None else self.due.isoformat(),
+                'interval': self.interval,
+                'ease': self.ease}
+
+    def text(self) -> str:
+        # What the full-text search sees of the card
+        return '%s\n%s' %(self.ftxt, self.btxt)
+
     def reviewed_today(self) -> bool:
         return (self.last_revision is not None
                 and self.last_revision.date() == TODAY)
 
-    def register_review(self, learned: bool):
+    def register_review(self, learned: bool, when: datetime = None):
         self.num_revisions += 1
-        self.last_revision = datetime.now()
+        self.last_revision = datetime.now() if when is None else when
         self.learned = learned
+        self._score_cache = None
+        self._schedule(SM2_QUALITY[learned])
+
+    def _schedule(self, quality: int):
+        # SM-2: failed cards start over, the others are spaced by a factor
+        # (the ease) that follows how hard the card has been
+        if quality < 3 or self.interval == 0:
+            self.interval = 1
+        elif self.interval == 1:
+            self.interval = 6
+        else:
+            self.interval = round(self.interval * self.ease)
+        self.ease = max(SM2_MIN_EASE, self.ease + 0.1
+                        - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        self.due = self.last_revision.date() + timedelta(self.interval)
 
     def score(self) -> int:
+        if self._score_cache is not None and self._score_cache[0] == TODAY:
+            return self._score_cache[1]
         score = 0 if self.learned else 100  # Starting score
         # Number of revisions penalty
         if self.num_revisions:
@@ -80,7 +188,35 @@ class Card:
             score += 100 + (days_since_revision - 14) * 2
         else:
             score += (100 / 14) * days_since_revision
-        return round(score)
+        score = round(score)
+        self._score_cache = (TODAY, score)
+        return score
+
+def score_cards(cards: Iterable[Card]) -> list[int]:
+    # Same as Card.score(), but vectorized over a whole deck
+    # numpy is imported on the first call, it isn't needed to start the app
+    cards = list(cards)
+    try:
+        import numpy as np
+    except ImportError:
+        return [c.score() for c in cards]
+    learned = np.fromiter(
+        (c.learned for c in cards), dtype=bool, count=len(cards))
+    num_revisions = np.fromiter(
+        (c.num_revisions for c in cards), dtype=np.int64, count=len(cards))
+    last_day = np.fromiter(
+        ((c.last_revision if c.num_revisions else c.creation).toordinal()
+         for c in cards), dtype=np.int64, count=len(cards))
+    score = np.where(learned, 0.0, 100.0) * 0.98 ** num_revisions
+    days_since_revision = np.maximum(0, TODAY.toordinal() - last_day)
+    score += np.where(
+        days_since_revision > 14,
+        100 + (days_since_revision - 14) * 2,
+        (100 / 14) * days_since_revision)
+    scores = np.round(score).astype(np.int64).tolist()
+    for card, score in zip(cards, scores):
+        card._score_cache = (TODAY, score)
+    return scores
 
 
 
@@ -88,7 +224,9 @@ def dump_default(obj: object) -> str:
     if isinstance(obj, Path):
         return str(obj.resolve())
     elif isinstance(obj, datetime):
-        return str_from_datetime(obj)
+        return encode_datetime(obj)
+    elif isinstance(obj, date):
+        return obj.isoformat()
     else:
         raise TypeError(
             'Object of type %s is not JSON serializable' %type(obj).__name__)
@@ -101,10 +239,11 @@ class Project:
     cards: dict[str, Card] = field(default_factory=dict)
     save_dir: str = None
     imgs_dir: str = None
+    journal_seq: int = 0  # Last journal entry folded into the snapshot
 
     def __post_init__(self):
         if not self.save_dir:
-            self.save_dir = PROJECTS_DIR / self.name.replace(' ', '-')
+            self.save_dir = project_dir(self.name)
             self.imgs_dir = self.save_dir / 'imgs'
         elif not self.imgs_dir:
             self.save_dir = Path(self.save_dir)
@@ -113,6 +252,28 @@ class Project:
             self.save_dir = Path(self.save_dir)
             self.imgs_dir = Path(self.imgs_dir)
         self.imgs_dir.mkdir(parents=True, exist_ok=True)
+        self._journal = Journal(
+            self.save_dir / 'journal.jsonl', self.journal_seq)
+        self._compaction = None
+        self._autosave = None
+        self._legacy_snapshot = False
+        self._db = None
+        self._search = None  # Built on the first search, if not loaded
+        self._search_saved = False  # search.json matches the project
+        # Due date -> names of the cards due then (None for new cards) and
+        # the sorted dates, built when first needed
+        self._due = None
+        self._due_days = None
+        # Monotonic times of the first and the last unsaved changes
+        self._dirty_since = None
+        self._changed_at = None
+        self._count_images()  # Image path -> number of card sides using it
+        # Running progress aggregates, recounted on load and day rollover
+        self._counters_day = None
+        self._today_revisions = 0
+        self._today_learnings = 0
+        self._total_learnings = 0
+        self._last_studied = self.creation
 
     @staticmethod
     def check_name(project_name: str) -> str:
@@ -123,7 +284,7 @@ class Project:
     @staticmethod
     def parse_project_dict(
             project_dict: dict[str, object]) -> dict[str, object]:
-        project_dict['creation'] = datetime_from_str(project_dict['creation'])
+        project_dict['creation'] = decode_datetime(project_dict['creation'])
         project_dict['cards'] = {
             name: Card.from_dict(card)
             for name, card in project_dict['cards'].items()}
@@ -134,19 +295,406 @@ class Project:
         return Project(**project_dict)
 
     @classmethod
-    def from_file(cls, project_json: Union[str, Path]) -> 'Project':
-        with open(str(project_json), mode='br') as json_file:
-            return cls.from_dict(load(json_file))
+    def from_file(
+            cls, project_json: Union[str, Path], replay: bool = True
+            ) -> 'Project':
+        # Cards are built while the file is read, never holding all of
+        # the cards decoded JSON at once
+        project_dict = {}
+        cards = {}
+        for key, value in iter_snapshot(project_json):
+            if key == 'card':
+                card = Card.from_dict(value)
+                cards[card.name] = card
+            else:
+                project_dict[key] = value
+        legacy = is_legacy_date(project_dict['creation'])
+        project_dict['creation'] = decode_datetime(project_dict['creation'])
+        project = cls(**project_dict, cards=cards)
+        project._legacy_snapshot = legacy
+        if replay:
+            for entry in project._journal.replay(project.journal_seq):
+                project._apply(entry)
+            project._count_images()
+            if project._journal.seq > project.journal_seq:
+                project._mark_changed()  # Not compacted before closing
+        return project
+
+    @classmethod
+    def from_db(cls, project_db: Union[str, Path]) -> 'Project':
+        db = CardDatabase(project_db)
+        project = cls.from_dict(db.read_project())
+        project._db = db
+        return project
+
+    @property
+    def storage(self) -> str:
+        return 'json' if self._db is None else 'sqlite'
+
+    def set_storage(self, storage: str):
+        if storage == self.storage:
+            return
+        if storage == 'sqlite':
+            self.save()  # Fold the journal before dropping the snapshot
+            self._db = CardDatabase(self.save_dir / 'project.db')
+            self.save()
+            os.remove(self.save_dir / 'project.json')
+        elif storage == 'json':
+            db, self._db = self._db, None
+            self.save()
+            db.close()
+            os.remove(db.path)
+        else:
+            raise ValueError('Unknown storage %r' %storage)
+
+    def _meta(self) -> dict[str, object]:
+        return {f.name: getattr(self, f.name)
+                for f in fields(self) if f.name != 'cards'}
+
+    def _write_db(self):
+        self._db.write_project(
+            dumps(self._meta(), default=dump_default),
+            (card.to_dict() for card in self.cards.values()))
+        self._write_summary()
+
+    def _write_snapshot(self):
+        # Cards are written one by one and last, so a streaming reader
+        # knows the whole project metadata before the first card
+        snapshot = self.save_dir / 'project.json'
+        tmp_snapshot = self.save_dir / 'project.json.tmp'
+        with open(tmp_snapshot, mode='w') as proj_file:
+            proj_file.write('{\n')
+            for key, value in self._meta().items():
+                proj_file.write('    %s: %s,\n' %(
+                    dumps(key), dumps(value, default=dump_default)))
+            proj_file.write('    "cards": {')
+            separator = '\n'
+            for name, card in self.cards.items():
+                proj_file.write('%s        %s: %s' %(
+                    separator, dumps(name), dumps(card.to_dict())))
+                separator = ',\n'
+            proj_file.write('\n    }\n}\n')
+            proj_file.flush()
+            os.fsync(proj_file.fileno())  # The journal goes right after
+        os.replace(tmp_snapshot, snapshot)
+        self._write_summary()
+
+    def summary(self) -> dict[str, object]:
+        summary = self.progress()
+        summary['last_studied'] = encode_datetime(summary['last_studied'])
+        summary['name'] = self.name
+        summary['save_dir'] = str(self.save_dir.resolve())
+        summary['num_cards'] = len(self.cards)
+        summary['date'] = TODAY.isoformat()
+        summary['storage'] = self.storage
+        return summary
+
+    def _write_summary(self, summary: dict[str, object] = None):
+        # Also written by compactions and autosaves, each thread has its
+        # temporary file
+        if summary is None:
+            summary = self.summary()
+        summary_path = self.save_dir / 'summary.json'
+        tmp_summary = self.save_dir / ('summary.json.%d.tmp' %get_ident())
+        with open(tmp_summary, mode='w') as summary_file:
+            dump(summary, summary_file, indent=4)
+            summary_file.flush()
+            os.fsync(summary_file.fileno())
+        os.replace(tmp_summary, summary_path)
 
     def save(self):
-        with open(self.save_dir / 'project.json', mode='w') as proj_file:
-            dump(asdict(self), proj_file, default=dump_default, indent=4)
+        self._mark_saved()
+        if self._db is not None:
+            return self._write_db()
+        self.wait_compaction()
+        self.journal_seq = self._journal.seq
+        self._write_snapshot()
+        self._journal.clear()
+        self._legacy_snapshot = False
+
+    def compact(self, wait: bool = False) -> bool:
+        # Returns whether the changes are being (or have been) saved
+        if self._db is not None:
+            return False  # Changes are written to the database right away
+        if not osp.isfile(self.save_dir / 'project.json'):
+            self.save()
+            return True
+        if wait:
+            self.wait_compaction()
+        elif self._compaction is not None and self._compaction.is_alive():
+            return False  # Try again on the next journal entry
+        self._mark_saved()
+        if self._journal.rotate():
+            self._compaction = Thread(
+                target=compact_snapshot, args=(self.save_dir,))
+            self._compaction.start()
+            COMPACTIONS[self.save_dir.resolve()] = self._compaction
+            if wait:
+                self.wait_compaction()
+        return True
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty_since is not None
+
+    def _mark_changed(self):
+        self._changed_at = monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = self._changed_at
+        self._search_saved = False
+
+    def _mark_saved(self):
+        self._dirty_since = self._changed_at = None
+
+    def autosave(self) -> bool:
+        # Debounced, a project is saved once its changes pause for a while,
+        # or once they have waited too long. The journal is synced to disk
+        # and the summary written in a thread, compactions are still left
+        # to the journal size
+        if self._dirty_since is None:
+            return False
+        if self._autosave is not None and self._autosave.is_alive():
+            return False  # Still syncing the previous changes
+        now = monotonic()
+        if (now - self._changed_at < AUTOSAVE_DELAY
+                and now - self._dirty_since < AUTOSAVE_MAX_DELAY):
+            return False
+        self._mark_saved()
+        self._autosave = Thread(target=self._sync, args=(
+            None if self._db is not None else self._journal.path,
+            self.summary()))
+        self._autosave.start()
+        return True
+
+    def _sync(self, journal: Union[Path, None], summary: dict[str, object]):
+        if journal is not None:
+            Journal.sync_path(journal)
+        self._write_summary(summary)
+
+    def wait_autosave(self):
+        if self._autosave is not None:
+            self._autosave.join()
+            self._autosave = None
+
+    def wait_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def close(self):
+        # The journal is synced, folding it into the snapshot is left to
+        # the next load or to its size. A running compaction is not waited
+        # for, its thread ends before the program does
+        save_search = self._search is not None and not self._search_saved
+        self.wait_autosave()
+        if self.dirty:
+            self._mark_saved()
+            self._journal.sync()
+            self._write_summary()
+        if self._db is not None:
+            self._db.close()
+        if save_search:
+            self._search.save(
+                self.save_dir / 'search.json', self._files_stamp())
+            self._search_saved = True
+        self._journal.close()
 
-    def delete(self):
-        destination = self.save_dir.parent / 'trash' / self.save_dir.name
-        if osp.isdir(destination):  # Project with the same name already deleted
-            shutil.rmtree(destination)
-        shutil.move(self.save_dir, destination, copy_function=shutil.copyfile)
+    def _files_stamp(self) -> list[list]:
+        return files_stamp(self.save_dir)
+
+    def load_search_index(self) -> bool:
+        # Must be called right after loading, before any change is made
+        self._search = load_search_index(self.save_dir)
+        self._search_saved = self._search is not None
+        return self._search_saved
+
+    def search_index(self) -> SearchIndex:
+        if self._search is None:
+            self._search = SearchIndex.from_texts(
+                (card.name, card.text()) for card in self.cards.values())
+        return self._search
+
+    def search(self, query: str) -> set[str]:
+        if not tokenize(query):
+            return set(self.cards)
+        return self.search_index().search(query)
+
+    def _log(self, op: str, **data):
+        self._log_many(op, (data,))
+
+    def _log_many(self, op: str, datas: Iterable[dict[str, object]]):
+        self._mark_changed()
+        if self._db is not None:
+            return self._db.apply_many({'op': op, **data} for data in datas)
+        self._journal.extend(op, datas)
+        if self._journal.size >= JOURNAL_COMPACT_SIZE:
+            self.compact()
+
+    def _apply(self, entry: dict[str, object]):
+        self._counters_day = None
+        self._due = self._due_days = None
+        if entry['op'] == 'review':
+            card = self.cards.get(entry['card'])
+            if card is not None:
+                card.register_review(
+                    entry['learned'], decode_datetime(entry['date']))
+        elif entry['op'] == 'put':
+            self.cards.pop(entry['old'], None)
+            card = Card.from_dict(entry['card'])
+            self.cards[card.name] = card
+        elif entry['op'] == 'delete':
+            self.cards.pop(entry['card'], None)
+
+    def review_card(self, name: str, learned: bool) -> Card:
+        card = self.cards[name]
+        self._count(card, -1)
+        self._index_due(card, -1)
+        card.register_review(learned)
+        self._count(card, 1)
+        self._index_due(card, 1)
+        # The SM-2 state is logged for the database, a journal replay
+        # computes it again
+        self._log('review', card=name, learned=learned,
+                  date=encode_datetime(card.last_revision),
+                  due=card.due.isoformat(), interval=card.interval,
+                  ease=card.ease)
+        return card
+
+    def add_card(self, card: Card):
+        self.cards[card.name] = card
+        self._count(card, 1)
+        self._index_due(card, 1)
+        self._log('put', card=card.to_dict(), old=None)
+        self._ref_images((card.fimg, card.bimg), 1)
+        if self._search is not None:
+            self._search.add(card.name, card.text())
+
+    def add_cards(self, cards: Iterable[Card]):
+        # Same as add_card() for each card, but written in one go
+        cards = list(cards)
+        for card in cards:
+            self.cards[card.name] = card
+            self._count(card, 1)
+            self._index_due(card, 1)
+        self._log_many(
+            'put', ({'card': card.to_dict(), 'old': None} for card in cards))
+        self._ref_images(
+            (img for card in cards for img in (card.fimg, card.bimg)), 1)
+        if self._search is not None:
+            for card in cards:
+                self._search.add(card.name, card.text())
+
+    def update_card(self, card_name: str, **changes) -> Card:
+        card = self.cards.pop(card_name)
+        old_images = (card.fimg, card.bimg)
+        old_text = card.text()
+        self._count(card, -1)
+        self._index_due(card, -1)
+        for attr, value in changes.items():
+            setattr(card, attr, value)
+        card._score_cache = None
+        self._count(card, 1)
+        self._index_due(card, 1)
+        self.cards[card.name] = card
+        self._log('put', card=card.to_dict(), old=card_name)
+        self._ref_images((card.fimg, card.bimg), 1)
+        self._ref_images(old_images, -1)
+        if self._search is not None:
+            self._search.remove(card_name, old_text)
+            self._search.add(card.name, card.text())
+        return card
+
+    def remove_card(self, name: str) -> Card:
+        card = self.cards.pop(name)
+        self._count(card, -1)
+        self._index_due(card, -1)
+        self._log('delete', card=name)
+        self._ref_images((card.fimg, card.bimg), -1)
+        if self._search is not None:
+            self._search.remove(name, card.text())
+        return card
+
+    def _count_images(self):
+        self._img_refs = Counter(
+            img for card in self.cards.values()
+            for img in (card.fimg, card.bimg) if img)
+
+    def _ref_images(self, images: Iterable[str], increment: int):
+        # Images stop being stored as soon as no card uses them
+        refs = self._img_refs
+        for img in images:
+            if not img:
+                continue
+            refs[img] += increment
+            if refs[img] <= 0:
+                del refs[img]
+                self._remove_image(img)
+
+    def _remove_image(self, img_path: str):
+        remove_image(img_path, self.imgs_dir)
+
+    def collect_images(self) -> int:
+        # Removes the stored images no card uses, left by popups closed or
+        # import rows skipped after their images were processed. Only for
+        # images folders of the project's own, others may be shared
+        if self.save_dir not in self.imgs_dir.parents:
+            return 0
+        refs = {Path(img).resolve() for img in self._img_refs}
+        removed = 0
+        for img_path in self.imgs_dir.iterdir():
+            if Path(base_image_path(str(img_path))).resolve() not in refs:
+                os.remove(img_path)
+                removed += 1
+        return removed
+
+    def delete(self) -> TrashEntry:
+        # The project folder is moved to the trash as is, its journal
+        # included, so restore_project() gets it back as it was
+        self.wait_autosave()
+        self.wait_compaction()
+        self._journal.close()
+        if self._db is not None:
+            self._db.close()
+        return TRASH.put(self.save_dir)
+
+    def filter_values(self, category: str) -> list[str]:
+        if category == 'Learned':
+            return ['Yes', 'No']
+        if category == 'Last revision':
+            if self._db is not None:
+                days = self._db.revision_days()
+            else:
+                days = sorted({card.last_revision.date().isoformat()
+                               for card in self.cards.values()
+                               if card.last_revision is not None},
+                              reverse=True)
+            return days + [NEVER]
+        return []
+
+    def filter_cards(self, category: str, value: str) -> set[str]:
+        # SQLite projects are filtered through the database indexes
+        if category == 'Text':
+            return self.search(value)
+        if category == 'Name':
+            if self._db is not None:
+                return self._db.names_by_prefix(value)
+            value = value.lower()
+            return {name for name in self.cards
+                    if name.lower().startswith(value)}
+        if category == 'Learned':
+            learned = value == 'Yes'
+            if self._db is not None:
+                return self._db.names_by_learned(learned)
+            return {name for name, card in self.cards.items()
+                    if card.learned == learned}
+        if category == 'Last revision':
+            day = None if value == NEVER else value
+            if self._db is not None:
+                return self._db.names_by_revision_day(day)
+            return {name for name, card in self.cards.items()
+                    if (card.last_revision.date().isoformat()
+                        if card.last_revision else None) == day}
+        return set(self.cards)
 
     def _cards_info(self):
         today_revisions = 0
@@ -166,70 +714,658 @@ class Project:
                 last_studied = card.last_revision
         return last_studied
 
+    def _recount(self):
+        (self._today_revisions,
+         self._today_learnings,
+         self._total_learnings) = self._cards_info()
+        self._last_studied = self.last_studied()
+        self._counters_day = TODAY
+
+    def _count(self, card: Card, sign: int):
+        # Adds (sign=1) or removes (sign=-1) a card from the aggregates
+        # The last studied date never goes back, even if the card is deleted
+        if self._counters_day != TODAY:
+            return  # Stale, progress() will recount everything
+        self._total_learnings += sign * card.learned
+        if card.reviewed_today():
+            self._today_revisions += sign
+            self._today_learnings += sign * card.learned
+        if card.last_revision and self._last_studied < card.last_revision:
+            self._last_studied = card.last_revision
+
     def progress(self):
-        today_revisions, today_learnings, total_learnings = self._cards_info()
-        last_studied = self.last_studied()
-        progress = (
-            100 * total_learnings / len(self.cards) if self.cards else 0.0)
-        return {'last_studied': last_studied,
-                'today_revisions': today_revisions,
-                'today_learnings': today_learnings,
-                'total_learnings': total_learnings,
-                'progress': progress}
+        if self._counters_day != TODAY:
+            self._recount()
+        progress = (100 * self._total_learnings / len(self.cards)
+                    if self.cards else 0.0)
+        return {'last_studied': self._last_studied,
+                'today_revisions': self._today_revisions,
+                'today_learnings': self._today_learnings,
+                'total_learnings': self._total_learnings,
+                'progress': progress,
+                'due_today': self.count_due(),
+                'due_week': self.count_due(TODAY + timedelta(6))}
+
+    # Spaced repetition, cards are looked up by due date instead of score
+
+    def _build_due(self):
+        self._due = {}
+        for card in self.cards.values():
+            self._due.setdefault(card.due, set()).add(card.name)
+        self._due_days = sorted(day for day in self._due if day is not None)
+
+    def _index_due(self, card: Card, sign: int):
+        # Adds (sign=1) or removes (sign=-1) a card from the due dates index
+        if self._due is None:
+            return  # Not built yet
+        if sign > 0:
+            names = self._due.get(card.due)
+            if names is None:
+                self._due[card.due] = names = set()
+                if card.due is not None:
+                    insort(self._due_days, card.due)
+            names.add(card.name)
+        else:
+            names = self._due[card.due]
+            names.discard(card.name)
+            if not names:
+                del self._due[card.due]
+                if card.due is not None:
+                    del self._due_days[bisect_left(self._due_days, card.due)]
+
+    def _due_until(self, day: date) -> Iterator[set[str]]:
+        # Buckets of the cards due on or before the day, most overdue first
+        # and new cards last
+        if self._due is None:
+            self._build_due()
+        for due in self._due_days[:bisect_right(self._due_days, day)]:
+            yield self._due[due]
+        if None in self._due:
+            yield self._due[None]
+
+    def count_due(self, day: date = None) -> int:
+        return sum(map(len, self._due_until(day or TODAY)))
+
+    def next_due_card(self, exclude: str = None) -> Union[Card, None]:
+        for names in self._due_until(TODAY):
+            for name in names:
+                if name != exclude:
+                    return self.cards[name]
+        return None
+
+
+
+def iter_snapshot(
+        project_json: Union[str, Path]) -> Iterator[tuple[str, object]]:
+    # Top level (key, value) pairs of a project file, except for the cards,
+    # which come one by one as ('card', card_dict) pairs
+    with open(str(project_json), mode='r', encoding='utf-8') as json_file:
+        stream = JSONStream(json_file)
+        for key in stream.members():
+            if key == 'cards':
+                for _ in stream.members():
+                    yield ('card', stream.value())
+            else:
+                yield (key, stream.value())
+
+def compact_snapshot(save_dir: Union[str, Path]):
+    project = Project.from_file(Path(save_dir) / 'project.json', replay=False)
+    for entry in Journal.read(
+            project._journal.rotated_path, project.journal_seq):
+        project._apply(entry)
+        project.journal_seq = entry['seq']
+    project._write_snapshot()
+    project._journal.discard_rotated()
+
+def files_stamp(save_dir: Union[str, Path]) -> list[list]:
+    # Identifies the saved state of a project, a persisted search index is
+    # only reused if the project files didn't change since it was written
+    stamp = []
+    for file_name in ('project.db', 'project.json',
+                      'journal.rotated', 'journal.jsonl'):
+        try:
+            stat = os.stat(osp.join(save_dir, file_name))
+        except FileNotFoundError:
+            continue
+        stamp.append([file_name, stat.st_mtime_ns, stat.st_size])
+    return stamp
+
+def load_search_index(
+        save_dir: Union[str, Path]) -> Union[SearchIndex, None]:
+    return SearchIndex.load(
+        osp.join(save_dir, 'search.json'), files_stamp(save_dir))
+
+def summary_due(summary: dict[str, object]) -> int:
+    # Cards due for a spaced repetition review, like Project.count_due().
+    # Summaries written before it was recorded only have the cards neither
+    # learned nor reviewed today
+    if 'due_today' in summary:
+        return summary['due_today']
+    due = summary['num_cards'] - summary['total_learnings']
+    if summary['date'] == TODAY.isoformat():
+        due -= summary['today_revisions'] - summary['today_learnings']
+    return due
+
+def release_images(folder: Union[str, Path]):
+    # Called by the trash before purging a project folder. Images stored
+    # in the folder go with it, the ones in a custom images folder are
+    # removed here. Only the files are read, the project isn't built
+    project_file = find_project_file(folder)
+    if project_file is None:
+        return
+    images = set()
+    if project_file.endswith('.db'):
+        db = CardDatabase(project_file)
+        try:
+            meta = db.read_project()
+        finally:
+            db.close()
+        for card in meta.pop('cards').values():
+            images.update((card['fimg'], card['bimg']))
+    else:
+        meta = {}
+        for key, value in iter_snapshot(project_file):
+            if key == 'card':
+                images.update((value['fimg'], value['bimg']))
+            else:
+                meta[key] = value
+        for entry in Journal(Path(folder) / 'journal.jsonl').replay():
+            if entry['op'] == 'put':
+                images.update((entry['card']['fimg'], entry['card']['bimg']))
+    if not meta.get('save_dir') or not meta.get('imgs_dir'):
+        return
+    save_dir, imgs_dir = Path(meta['save_dir']), Path(meta['imgs_dir'])
+    if imgs_dir == save_dir or save_dir in imgs_dir.parents:
+        return
+    for img in images:
+        if img:
+            remove_image(img, imgs_dir)
+
+def restore_project(entry: TrashEntry) -> Project:
+    # Projects save absolute paths, so they go back to where they were
+    if find_project_file(entry.path) is None:
+        raise FileNotFoundError('No project in %s' %entry.path)
+    save_dir = TRASH.restore(entry, PROJECTS_DIR / entry.name)
+    return load_project(find_project_file(save_dir))
 
+def last_trashed() -> Union[TrashEntry, None]:
+    # Most recently deleted project that can be restored
+    for entry in TRASH.entries():
+        if find_project_file(entry.path) is not None:
+            return entry
+    return None
 
+def project_dir(name: str) -> Path:
+    # Default folder of a project, taken even before the project is loaded
+    return PROJECTS_DIR / name.replace(' ', '-')
+
+def find_project_file(save_dir: Union[str, Path]) -> Union[str, None]:
+    for file_name in ('project.db', 'project.json'):
+        project = osp.join(save_dir, file_name)
+        if osp.isfile(project):
+            return project
+    return None
 
 def get_project_files() -> list[str]:
     projects_files = []
     for item in os.listdir(PROJECTS_DIR):
-        project = osp.join(PROJECTS_DIR, item, 'project.json')
-        if osp.isfile(project):
+        project = find_project_file(osp.join(PROJECTS_DIR, item))
+        if project is not None:
             projects_files.append(project)
     return projects_files
 
-def load_projects() -> dict[str, Project]:
-    projects = [Project.from_file(f) for f in get_project_files()]
-    return {p.name: p for p in projects}
+def _read_project(project_file: Union[str, Path]) -> Project:
+    # Can run in another process, the result must be picklable
+    compaction = COMPACTIONS.pop(Path(project_file).parent.resolve(), None)
+    if compaction is not None:
+        compaction.join()
+    if str(project_file).endswith('.db'):
+        project = Project.from_db(project_file)
+    else:
+        project = Project.from_file(project_file)
+    project.load_search_index()
+    project.collect_images()  # Nothing can be processing its images yet
+    return project
+
+def _finish_project(project: Project) -> Project:
+    if (project.storage == 'json'
+            and len(project.cards) >= SQLITE_MIGRATION_SIZE):
+        project.set_storage('sqlite')
+    elif project._legacy_snapshot:
+        project.save()  # Migrate the dates to the new format
+    elif (project.storage == 'json'
+            and project._journal.size >= JOURNAL_COMPACT_SIZE):
+        project.compact()  # In the background, closing doesn't fold it
+    return project
+
+def load_project(project_file: Union[str, Path]) -> Project:
+    return _finish_project(_read_project(project_file))
+
+def _process_pool(workers: int) -> Union[ProcessPoolExecutor,
+                                          ThreadPoolExecutor]:
+    # Workers are forked, so they don't import the app script again (it
+    # runs the app at import). Without fork the projects are parsed in
+    # threads, which at least keeps the app responsive
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return ThreadPoolExecutor(workers)
+    return ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context('fork'))
+
+# Parses JSON projects in a process pool, as parsing and building the cards
+# is CPU bound. Projects can be waited for by iterating over the loader, or
+# collected as they finish with `finished()`. Create it before starting any
+# thread (Tk included), since the workers are forked right away
+# SQLite projects are read in the caller's thread, on collection
+class ProjectLoader:
+
+    def __init__(
+            self, project_files: Iterable[Union[str, Path]],
+            workers: int = None):
+        project_files = list(project_files)
+        self._files = [f for f in project_files if str(f).endswith('.db')]
+        json_files = [f for f in project_files if f not in self._files]
+        self._pool = None
+        self._futures = []
+        if json_files:
+            self._pool = _process_pool(
+                min(len(json_files), workers or os.cpu_count()))
+            self._futures = [self._pool.submit(_read_project, f)
+                             for f in json_files]
+
+    def pending(self) -> int:
+        return len(self._files) + len(self._futures)
+
+    def finished(self) -> list[Project]:
+        projects = [_finish_project(_read_project(f)) for f in self._files]
+        self._files = []
+        futures = self._futures
+        self._futures = [f for f in futures if not f.done()]
+        projects.extend(
+            _finish_project(f.result()) for f in futures if f.done())
+        self._release()
+        return projects
+
+    def __iter__(self) -> Iterator[Project]:
+        files, self._files = self._files, []
+        for project_file in files:
+            yield _finish_project(_read_project(project_file))
+        for future in as_completed(self._futures):
+            self._futures.remove(future)
+            yield _finish_project(future.result())
+        self._release()
+
+    def _release(self):
+        if not self._futures and self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._files = []
+        self._futures = []
+
+# Lightweight listing of the projects based on their summary files
+# Projects are fully loaded only when accessed by name
+class ProjectIndex:
+
+    def __init__(self, summaries: dict[str, dict[str, object]]):
+        self.summaries = summaries
+        self._loaded = {}
+        self._indexes = {}  # Search indexes of the projects not loaded
+        self.missing = []  # Files of the projects without summary
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.summaries
+
+    def __iter__(self):
+        return iter(self.summaries)
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def keys(self):
+        return self.summaries.keys()
+
+    def __getitem__(self, name: str) -> Project:
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        summary = self.summaries[name]
+        project = load_project(find_project_file(summary['save_dir']))
+        self._loaded[name] = project
+        return project
+
+    def __setitem__(self, name: str, project: Project):
+        self._loaded[name] = project
+        self.summaries[name] = project.summary()
+
+    def __delitem__(self, name: str):
+        del self.summaries[name]
+        self._loaded.pop(name, None)
+        self._indexes.pop(name, None)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def loaded(self) -> list[Project]:
+        return list(self._loaded.values())
+
+    def delete(self, name: str) -> TrashEntry:
+        # A project not loaded is trashed without reading it
+        project = self._loaded.get(name)
+        if project is None:
+            entry = TRASH.put(self.summaries[name]['save_dir'])
+        else:
+            entry = project.delete()
+        del self[name]
+        return entry
+
+    def restore(self, entry: TrashEntry) -> Project:
+        project = restore_project(entry)
+        self[project.name] = project
+        return project
+
+    def add_missing(self, project: Project):
+        # Project saved before summaries existed, now loaded
+        project._write_summary()
+        self[project.name] = project
+
+    def rescore(self, name: str) -> list[int]:
+        # Scores of the project cards, its summary file rewritten with
+        # today's numbers
+        project = self[name]
+        scores = score_cards(project.cards.values())
+        project._write_summary()
+        self.summaries[name] = project.summary()
+        return scores
+
+    # Queries over all the projects, answered from the summary and search
+    # index files. Only loaded projects, or the ones without an up to date
+    # search index, are asked directly
+
+    def summary(self, name: str) -> dict[str, object]:
+        project = self._loaded.get(name)
+        return self.summaries[name] if project is None else project.summary()
+
+    def totals(self) -> dict[str, object]:
+        totals = {'num_projects': len(self), 'num_cards': 0, 'due': 0,
+                  'total_learnings': 0, 'today_revisions': 0,
+                  'today_learnings': 0, 'last_studied': None}
+        today = TODAY.isoformat()
+        for name in self:
+            summary = self.summary(name)
+            totals['num_cards'] += summary['num_cards']
+            totals['total_learnings'] += summary['total_learnings']
+            totals['due'] += summary_due(summary)
+            if summary['date'] == today:
+                totals['today_revisions'] += summary['today_revisions']
+                totals['today_learnings'] += summary['today_learnings']
+            last_studied = decode_datetime(summary['last_studied'])
+            if (totals['last_studied'] is None
+                    or totals['last_studied'] < last_studied):
+                totals['last_studied'] = last_studied
+        totals['progress'] = (
+            100 * totals['total_learnings'] / totals['num_cards']
+            if totals['num_cards'] else 0.0)
+        return totals
+
+    def _search_index(self, name: str) -> Union[SearchIndex, None]:
+        save_dir = self.summaries[name]['save_dir']
+        stamp = files_stamp(save_dir)
+        cached = self._indexes.get(name)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        index = load_search_index(save_dir)
+        if index is None:
+            self._indexes.pop(name, None)
+        else:
+            self._indexes[name] = (stamp, index)
+        return index
+
+    def search(self, query: str) -> dict[str, set[str]]:
+        # Project name -> names of its cards matching the query
+        matches = {}
+        if not tokenize(query):
+            return matches
+        for name in self:
+            index = (None if name in self._loaded
+                     else self._search_index(name))
+            if index is None:
+                names = self[name].search(query)
+            else:
+                names = index.search(query)
+            if names:
+                matches[name] = names
+        return matches
+
+def load_project_index(wait: bool = True) -> ProjectIndex:
+    # Without waiting, the projects without summary are left in `missing`
+    # to be loaded by the caller, e.g. with a ProjectLoader
+    summaries = {}
+    missing = []
+    for project_file in get_project_files():
+        summary_file = osp.join(osp.dirname(project_file), 'summary.json')
+        try:
+            with open(summary_file, mode='br') as json_file:
+                summary = load(json_file)
+        except FileNotFoundError:
+            missing.append(project_file)
+            continue
+        summaries[summary['name']] = summary
+    index = ProjectIndex(summaries)
+    if wait:
+        for project in ProjectLoader(missing):
+            index.add_missing(project)
+    else:
+        index.missing = missing
+    return index
 
 def clear_whitespaces(string: str):
     return ' '.join(string.split())
 
-def insert_card(card: Card, cards: list[Card]) -> int:
-    score = card.score()
-    for i, c in enumerate(cards):
-        if c.score() < score:
-            cards.insert(i, card)
-            return i
-    cards.append(card)
-    return len(cards) - 1
+def read_import_rows(
+        file_path: str) -> Iterator[tuple[int, dict[str, str]]]:
+    # (line, row) pairs of a CSV file (TSV for .tsv and .tab files) which
+    # first row names the columns, see IMPORT_COLUMNS
+    tabs = osp.splitext(file_path)[1].lower() in ('.tsv', '.tab')
+    delimiter = '\t' if tabs else ','
+    with open(file_path, mode='r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [clear_whitespaces(column).lower()
+                  for column in next(reader, ())]
+        for row in reader:
+            if any(row):
+                yield (reader.line_num, dict(zip(header, row)))
+
+def read_import(
+        file_path: str, names: Iterable[str] = ()
+        ) -> tuple[list[tuple[str, str, str, str, str]], list[str]]:
+    # Checks the rows of a file to import like the card popup checks its
+    # content. Returns the (name, fimg, ftxt, bimg, btxt) of the valid rows
+    # and the problems found in the others. Relative image paths are taken
+    # from the file folder. `names` are the cards already in the project
+    folder = osp.dirname(osp.abspath(file_path))
+    names = set(names)
+    rows = []
+    errors = []
+    for line, row in read_import_rows(file_path):
+        name = clear_whitespaces(row.get(IMPORT_COLUMNS[0]) or '')
+        if not name:
+            errors.append('Line %d: invalid card name.' %line)
+            continue
+        if name in names:
+            errors.append(
+                'Line %d: a card named "%s" already exists.' %(line, name))
+            continue
+        images = []
+        for column in IMPORT_COLUMNS[3:]:
+            img = (row.get(column) or '').strip()
+            if img:
+                img = osp.join(folder, img)
+                if not check_image(img):
+                    errors.append(
+                        'Line %d: nonexistent or unsupported %s.'
+                        %(line, column))
+                    break
+            images.append(img)
+        else:
+            names.add(name)
+            rows.append((
+                name, images[0],
+                clear_whitespaces(row.get(IMPORT_COLUMNS[1]) or ''),
+                images[1],
+                clear_whitespaces(row.get(IMPORT_COLUMNS[2]) or '')))
+    return (rows, errors)
 
 def check_image(img_path: str) -> bool:
     return osp.isfile(img_path) and osp.splitext(img_path)[1] in IMG_FMTS
 
+def file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, mode='rb') as digest_file:
+        for chunk in iter(lambda: digest_file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def process_image(img_path: str, destination: str) -> Union[None, str]:
+    # Images are stored by content, identical images are processed once
+    if not osp.isfile(img_path):
+        return None
+    ext = osp.splitext(img_path)[1].lower()
     if osp.isdir(destination):
-        destination = osp.join(destination, osp.basename(img_path))
+        if osp.samefile(osp.dirname(osp.abspath(img_path)), destination):
+            return img_path  # Already stored
+        destination = osp.join(
+            destination, "%s%s" %(file_digest(img_path)[:32], ext))
     if osp.isfile(destination):
-        return destination  # Assume that the image has been processed before
+        return destination  # Same content processed before
     if not osp.isdir(osp.dirname(destination)):
         return None  # All folders must already exist
-    if not destination.endswith(osp.splitext(img_path)[1]):
-        destination = "%s%s" %(
-            osp.splitext(destination)[0], osp.splitext(img_path)[1])
+    if not destination.endswith(ext):
+        destination = "%s%s" %(osp.splitext(destination)[0], ext)
+    from PIL import Image  # Only needed here, slow to import
+    with Image.open(img_path) as img:
+        # Variants first, the main image signals a finished processing
+        # A variant is only needed if it differs from the main image
+        w, h = img.size
+        for variant, limits in IMG_VARIANTS.items():
+            if (w > min(limits[0], IMG_LIMITS[0])
+                    or h > min(limits[1], IMG_LIMITS[1])):
+                save_fitted_image(
+                    img, img_path, variant_path(destination, variant), limits)
+        return save_fitted_image(img, img_path, destination, IMG_LIMITS)
+
+def save_fitted_image(
+        img: 'Image.Image', img_path: str, destination: str,
+        limits: tuple[int, int]) -> str:
+    # Written under a temporary name, so concurrent ingestions of the same
+    # content never leave a partially written image behind
+    tmp_destination = "%s.%d.tmp%s" %(
+        osp.splitext(destination)[0], get_ident(),
+        osp.splitext(destination)[1])
     try:
-        with Image.open(img_path) as img:
-            w, h = img.size
-            if w <= IMG_LIMITS[0] and h <= IMG_LIMITS[1]:
-                shutil.copyfile(img_path, destination)
-                return destination
-            if (w / IMG_LIMITS[0]) > (h / IMG_LIMITS[1]):
-                nw = IMG_LIMITS[0]
+        w, h = img.size
+        if w <= limits[0] and h <= limits[1]:
+            shutil.copyfile(img_path, tmp_destination)
+        else:
+            if (w / limits[0]) > (h / limits[1]):
+                nw = limits[0]
                 nh = round(nw * h / w)
             else:
-                nh = IMG_LIMITS[1]
+                nh = limits[1]
                 nw = round(nh * w / h)
             resized = img.resize((nw, nh))
-            resized.save(destination)
-            return destination
-    except FileNotFoundError:
+            resized.save(tmp_destination, format=img.format)
+        os.replace(tmp_destination, destination)
+        return destination
+    finally:
+        if osp.isfile(tmp_destination):
+            os.remove(tmp_destination)
+
+def remove_image(img_path: str, imgs_dir: Path):
+    # The image and its variants, if it is stored in `imgs_dir`
+    if Path(img_path).parent.resolve() != imgs_dir.resolve():
+        return  # Not managed by the project
+    for variant in (None, *IMG_VARIANTS):
+        try:
+            os.remove(img_path if variant is None
+                      else variant_path(img_path, variant))
+        except FileNotFoundError:
+            pass
+
+def variant_path(img_path: str, variant: str) -> str:
+    root, ext = osp.splitext(img_path)
+    return "%s.%s%s" %(root, variant, ext)
+
+def base_image_path(img_path: str) -> str:
+    # Main image of a variant, or the path itself
+    root, ext = osp.splitext(img_path)
+    base, variant = osp.splitext(root)
+    return base + ext if variant[1:] in IMG_VARIANTS else img_path
+
+def image_variant(img_path: str, variant: str) -> str:
+    # Small images don't have every variant, the main image is used instead
+    if variant in IMG_VARIANTS:
+        path = variant_path(img_path, variant)
+        if osp.isfile(path):
+            return path
+    return img_path
+
+
+def _process_image(img_path: str, destination: str) -> Union[None, str]:
+    try:
+        return process_image(img_path, destination)
+    except Exception:  # OSError, PIL.DecompressionBombError, ...
         return None
+
+# Processes images in a thread pool (Pillow releases the GIL while decoding
+# and resizing), so large images or bulk imports don't freeze the app
+# `schedule` must call its argument later in the caller's thread, like Tk's
+# `after`, and is used to poll the finished jobs and run their callbacks
+class ImageIngestor:
+
+    def __init__(
+            self, schedule: Callable[[Callable], object],
+            workers: int = None):
+        self._pool = ThreadPoolExecutor(workers or os.cpu_count())
+        self._schedule = schedule
+        self._jobs = []
+        self._polling = False
+
+    def submit(
+            self, img_paths: Iterable[str], destination: str,
+            callback: Callable[[list[Union[None, str]]], object]):
+        # Empty paths are kept as is, failures are reported as None
+        futures = [self._pool.submit(_process_image, path, destination)
+                   if path else path
+                   for path in img_paths]
+        self._jobs.append((futures, callback))
+        if not self._polling:
+            self._polling = True
+            self._schedule(self._poll)
+
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    def _poll(self):
+        jobs = self._jobs
+        self._jobs = []
+        try:
+            for futures, callback in jobs:
+                if not all(not f or f.done() for f in futures):
+                    self._jobs.append((futures, callback))
+                    continue
+                try:
+                    callback([f.result() if f else f for f in futures])
+                except Exception:  # Reported, the other jobs still finish
+                    sys.excepthook(*sys.exc_info())
+        finally:
+            self._polling = bool(self._jobs)
+            if self._polling:
+                self._schedule(self._poll)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,214 @@
+import random
+from bisect import bisect_left, insort
+from heapq import heapify, heappop, heappush
+from typing import Iterable, Iterator, Union
+from model import Card, score_cards
+
+
+
+# Draws names with a probability proportional to their (integer) weights
+# A Fenwick tree over the slots of the names keeps the prefix sums, so
+# drawing and changing a weight are O(log n). Slots of removed names are
+# reused, their weight is 0 meanwhile
+class WeightedSampler:
+
+    def __init__(self, items: Iterable[tuple[str, int]] = ()):
+        self._slots = {}
+        self._names = []
+        self._weights = []
+        self._free = []
+        for name, weight in items:
+            self._slots[name] = len(self._names)
+            self._names.append(name)
+            self._weights.append(weight)
+        self._build(len(self._names))
+
+    def _build(self, capacity: int):
+        # Tree is 1-indexed, slots are 0-indexed
+        self._tree = [0] * (capacity + 1)
+        self._tree[1:len(self._weights) + 1] = self._weights
+        for idx in range(1, len(self._tree)):
+            parent = idx + (idx & -idx)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[idx]
+        self.total = sum(self._weights)
+
+    def _add(self, slot: int, delta: int):
+        self._weights[slot] += delta
+        self.total += delta
+        idx = slot + 1
+        while idx < len(self._tree):
+            self._tree[idx] += delta
+            idx += idx & -idx
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._slots
+
+    def set(self, name: str, weight: int):
+        slot = self._slots.get(name)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._names[slot] = name
+            else:
+                slot = len(self._names)
+                self._names.append(name)
+                self._weights.append(0)
+                if len(self._tree) <= len(self._names):
+                    self._build(2 * len(self._names))
+            self._slots[name] = slot
+        self._add(slot, weight - self._weights[slot])
+
+    def remove(self, name: str):
+        slot = self._slots.pop(name)
+        self._add(slot, -self._weights[slot])
+        self._names[slot] = None
+        self._free.append(slot)
+
+    def sample(self, exclude: str = None) -> Union[str, None]:
+        # The excluded name weighs nothing during the draw
+        excluded = self._slots.get(exclude)
+        if excluded is not None:
+            weight = self._weights[excluded]
+            self._add(excluded, -weight)
+        try:
+            if self.total <= 0:
+                return None
+            rest = random.randrange(self.total)
+            idx = 0
+            step = 1 << (len(self._tree) - 1).bit_length()
+            while step:
+                if (idx + step < len(self._tree)
+                        and self._tree[idx + step] <= rest):
+                    idx += step
+                    rest -= self._tree[idx]
+                step >>= 1
+            return self._names[idx]  # Slot idx, tree index idx + 1
+        finally:
+            if excluded is not None:
+                self._add(excluded, weight)
+
+# Keeps the cards of a project ordered by score (descending)
+# The sorted list backs the cards list view and a heap (with lazy deletion)
+# gives the next card due for revision without scanning the whole project
+# Random picks (quiz mode) favour high score cards through a sampler
+class Scheduler:
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self.rebuild(cards)
+
+    @staticmethod
+    def _key(card: Card) -> tuple[int, str]:
+        return (-card.score(), card.name)
+
+    @staticmethod
+    def _weight(score: int) -> int:
+        return score + 1  # Cards scoring 0 can still be picked
+
+    @staticmethod
+    def is_due(card: Card) -> bool:
+        return not (card.learned or card.reviewed_today())
+
+    def rebuild(self, cards: Iterable[Card] = None):
+        if cards is None:
+            cards = list(self._cards.values())
+        self._cards = {card.name: card for card in cards}
+        self._keys = {
+            name: (-score, name)
+            for name, score in zip(
+                self._cards, score_cards(self._cards.values()))}
+        self._order = sorted(self._keys.values())
+        self._sampler = WeightedSampler(
+            (name, self._weight(-key[0])) for name, key in self._keys.items())
+        self._due = [self._keys[name]
+                     for name, card in self._cards.items()
+                     if self.is_due(card)]
+        heapify(self._due)
+        self._queued = set(self._due)  # Keys in the heap, valid or not
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._cards
+
+    def __iter__(self) -> Iterator[Card]:
+        return (self._cards[name] for _, name in self._order)
+
+    def card_at(self, idx: int) -> Card:
+        return self._cards[self._order[idx][1]]
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Card, list[Card]]:
+        if isinstance(idx, slice):
+            return [self._cards[name] for _, name in self._order[idx]]
+        return self.card_at(idx)
+
+    def index(self, name: str) -> int:
+        return bisect_left(self._order, self._keys[name])
+
+    def insert(self, card: Card) -> int:
+        key = self._key(card)
+        self._cards[card.name] = card
+        self._keys[card.name] = key
+        insort(self._order, key)
+        self._sampler.set(card.name, self._weight(-key[0]))
+        if self.is_due(card) and key not in self._queued:
+            heappush(self._due, key)
+            self._queued.add(key)
+            if len(self._due) > 2 * len(self._cards) + 64:
+                self._compact_due()
+        return self.index(card.name)
+
+    def _compact_due(self):
+        # Stale keys are only dropped when popped, some may never be
+        self._due = [key for key in self._due if self._valid(key)]
+        heapify(self._due)
+        self._queued = set(self._due)
+
+    def remove(self, name: str) -> int:
+        idx = self.index(name)
+        del self._order[idx]
+        del self._keys[name]
+        del self._cards[name]
+        self._sampler.remove(name)
+        return idx
+
+    def update(self, card: Card, old_name: str = None) -> tuple[int, int]:
+        old_idx = self.remove(card.name if old_name is None else old_name)
+        return (old_idx, self.insert(card))
+
+    def _valid(self, key: tuple[int, str]) -> bool:
+        name = key[1]
+        return self._keys.get(name) == key and self.is_due(self._cards[name])
+
+    def upcoming(self, count: int, exclude: str = None) -> list[Card]:
+        # Next `count` due cards, in the order they would be picked
+        taken = []
+        cards = []
+        while self._due and len(cards) < count:
+            key = heappop(self._due)
+            self._queued.discard(key)
+            if not self._valid(key):
+                continue
+            taken.append(key)
+            if key[1] != exclude:
+                cards.append(self._cards[key[1]])
+        for key in taken:
+            heappush(self._due, key)
+            self._queued.add(key)
+        return cards
+
+    def next_due(self, exclude: str = None) -> Union[Card, None]:
+        cards = self.upcoming(1, exclude)
+        return cards[0] if cards else None
+
+    def sample(self, exclude: str = None) -> Union[Card, None]:
+        # Random card, weighted by score. The excluded card is only picked
+        # if it is the only one
+        name = self._sampler.sample(exclude)
+        if name is None and exclude in self._cards:
+            name = exclude
+        return None if name is None else self._cards[name]
@@ -0,0 +1,95 @@
+import os
+import re
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Iterable, Union
+from json import load, dump
+
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+
+def tokenize(text: str) -> set[str]:
+    return {token.casefold() for token in TOKEN_RE.findall(text)}
+
+# Inverted index from the words of the cards texts to the cards names
+# Every word of a query matches as a prefix and all of them must match
+class SearchIndex:
+
+    def __init__(self, postings: dict[str, set[str]] = None):
+        self._postings = {} if postings is None else postings
+        self._tokens = sorted(self._postings)
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[tuple[str, str]]) -> 'SearchIndex':
+        index = cls()
+        for name, text in texts:
+            for token in tokenize(text):
+                index._postings.setdefault(token, set()).add(name)
+        index._tokens = sorted(index._postings)
+        return index
+
+    def add(self, name: str, text: str):
+        for token in tokenize(text):
+            names = self._postings.get(token)
+            if names is None:
+                self._postings[token] = names = set()
+                insort(self._tokens, token)
+            names.add(name)
+
+    def remove(self, name: str, text: str):
+        for token in tokenize(text):
+            names = self._postings.get(token)
+            if names is None:
+                continue
+            names.discard(name)
+            if not names:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def _prefixed(self, prefix: str) -> set[str]:
+        names = set()
+        idx = bisect_left(self._tokens, prefix)
+        while (idx < len(self._tokens)
+               and self._tokens[idx].startswith(prefix)):
+            names |= self._postings[self._tokens[idx]]
+            idx += 1
+        return names
+
+    def search(self, query: str) -> set[str]:
+        result = None
+        # Longest words first, as prefixes they usually match the fewest
+        # cards, so the intersection shrinks quickly. Posting sizes aren't
+        # known before a prefix's matches are merged
+        for prefix in sorted(tokenize(query), key=len, reverse=True):
+            names = self._prefixed(prefix)
+            result = names if result is None else result & names
+            if not result:
+                break
+        return set() if result is None else result
+
+    def save(self, path: Union[str, Path], stamp: object):
+        tmp_path = '%s.tmp' %path
+        with open(tmp_path, mode='w') as index_file:
+            dump({'stamp': stamp,
+                  'postings': {token: list(names)
+                               for token, names in self._postings.items()}},
+                 index_file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(
+            cls, path: Union[str, Path], stamp: object
+            ) -> Union['SearchIndex', None]:
+        # Returns None if the index doesn't match the given stamp
+        try:
+            with open(path, mode='br') as index_file:
+                index_dict = load(index_file)
+        except FileNotFoundError:
+            return None
+        if index_dict['stamp'] != stamp:
+            return None
+        return cls({token: set(names)
+                    for token, names in index_dict['postings'].items()})
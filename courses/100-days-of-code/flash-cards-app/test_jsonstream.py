@@ -0,0 +1,106 @@
+"""Unit tests for jsonstream.py module."""
+
+
+import io
+import json
+import random
+import unittest
+from json import JSONDecodeError
+from unittest import mock
+import jsonstream
+from jsonstream import JSONStream
+
+
+CHUNK_SIZES = (1, 2, 3, 5, 7, 64)
+NUMBERS = (0, -0.0, 1, -1, 10, 123456789, -98765, 0.5, -1.25, 1.5e10,
+           -2.5e-7, 1e100, 3.141592653589793)
+
+
+def random_string(rng):
+    chars = 'ab ,:{}[]"\\\n\t/é€😀'
+    return ''.join(rng.choice(chars) for _ in range(rng.randrange(8)))
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(8 if depth < 4 else 5)
+    if kind == 0:
+        return rng.choice(NUMBERS)
+    if kind == 1:
+        return rng.randrange(-10 ** 6, 10 ** 6) * 10 ** rng.randrange(4)
+    if kind == 2:
+        return rng.uniform(-1e6, 1e6)
+    if kind == 3:
+        return random_string(rng)
+    if kind == 4:
+        return rng.choice((True, False, None))
+    if kind == 5:
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(5))]
+    return {random_string(rng): random_value(rng, depth + 1)
+            for _ in range(rng.randrange(5))}
+
+def random_dump(rng, value):
+    return json.dumps(
+        value, ensure_ascii=rng.random() < 0.5,
+        indent=rng.choice((None, 0, 2, '\t')),
+        separators=rng.choice((None, (',', ':'), (' , ', ' : '))))
+
+def read(stream):
+    # Objects member by member, like the project loader does
+    if stream.peek() == '{':
+        return {key: read(stream) for key in stream.members()}
+    return stream.value()
+
+
+class JSONStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def parse(self, text, chunk_size):
+        with mock.patch.object(jsonstream, 'CHUNK_SIZE', chunk_size):
+            stream = JSONStream(io.StringIO(text))
+            value = read(stream)
+            self.assertEqual(stream.peek(), '')
+        return value
+
+    def test_random_documents(self):
+        for _ in range(300):
+            text = random_dump(self.rng, random_value(self.rng))
+            for chunk_size in CHUNK_SIZES:
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(self.parse(text, chunk_size),
+                                     json.loads(text))
+
+    def test_numbers_across_chunks(self):
+        # A chunk may end anywhere in a number, e.g. after '-', '1.' or 'e'
+        for number in ('0', '-0', '7', '-12', '12.5', '-0.25', '1e5',
+                       '1E+5', '-1.5e-10', '123456789012345678901234567890'):
+            for padding in range(8):
+                for text in (number, '[%s]' %number,
+                             ' ' * padding + '{"n": %s}' %number,
+                             '{"a": %s, "b": %s}' %(number, number)):
+                    for chunk_size in CHUNK_SIZES:
+                        with self.subTest(text=text, chunk_size=chunk_size):
+                            self.assertEqual(self.parse(text, chunk_size),
+                                             json.loads(text))
+
+    def test_members_order(self):
+        text = '{"b": 1, "a": {"c": [1, 2]}, "d": "x"}'
+        for chunk_size in CHUNK_SIZES:
+            with mock.patch.object(jsonstream, 'CHUNK_SIZE', chunk_size):
+                stream = JSONStream(io.StringIO(text))
+                keys = []
+                for key in stream.members():
+                    keys.append(key)
+                    stream.value()
+                self.assertEqual(keys, ['b', 'a', 'd'])
+
+    def test_invalid_documents(self):
+        for text in ('', '{', '{"a"', '{"a": }', '{"a": 1', '{"a" 1}',
+                     '{"a": 1 "b": 2}', '{1: 2}', '[1, 2', '"abc', 'nul'):
+            for chunk_size in CHUNK_SIZES:
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    with self.assertRaises(JSONDecodeError):
+                        self.parse(text, chunk_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Unit tests for scheduler.py module."""
+
+
+import random
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from model import Card
+from scheduler import Scheduler, WeightedSampler
+
+
+def make_card(name, days_old=0, learned=False):
+    creation = datetime.now() - timedelta(days=days_old)
+    return Card(name, '', 'front', '', 'back',
+                creation=creation, learned=learned)
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        # Older cards score higher
+        self.cards = [make_card('k%d' %i, days_old=i) for i in range(10)]
+        self.scheduler = Scheduler(self.cards)
+
+    def test_order(self):
+        names = [card.name for card in self.scheduler]
+        self.assertEqual(names, ['k%d' %i for i in range(9, -1, -1)])
+        self.assertEqual(self.scheduler.index('k9'), 0)
+        self.assertEqual(self.scheduler[0].name, 'k9')
+        self.assertEqual(len(self.scheduler), 10)
+
+    def test_ties_by_name(self):
+        scheduler = Scheduler([make_card(name) for name in 'cab'])
+        self.assertEqual([card.name for card in scheduler], ['a', 'b', 'c'])
+
+    def test_insert_and_remove(self):
+        idx = self.scheduler.insert(make_card('new', days_old=100))
+        self.assertEqual(idx, 0)
+        self.assertIn('new', self.scheduler)
+        self.assertEqual(self.scheduler.remove('new'), 0)
+        self.assertNotIn('new', self.scheduler)
+        self.assertEqual(self.scheduler.next_due().name, 'k9')
+
+    def test_next_due(self):
+        self.assertEqual(self.scheduler.next_due().name, 'k9')
+        self.assertEqual(self.scheduler.next_due('k9').name, 'k8')
+        card = self.scheduler[0]
+        card.register_review(True)
+        self.scheduler.update(card)
+        self.assertEqual(self.scheduler.next_due().name, 'k8')
+        self.assertIsNone(Scheduler().next_due())
+
+    def test_next_due_skips_learned(self):
+        scheduler = Scheduler(
+            [make_card('a', 5, learned=True), make_card('b', 1)])
+        self.assertEqual(scheduler.next_due().name, 'b')
+        self.assertIsNone(scheduler.next_due('b'))
+
+    def test_upcoming(self):
+        names = [card.name for card in self.scheduler.upcoming(3)]
+        self.assertEqual(names, ['k9', 'k8', 'k7'])
+        names = [card.name for card in self.scheduler.upcoming(3, 'k8')]
+        self.assertEqual(names, ['k9', 'k7', 'k6'])
+        # Asking again gives the same cards, nothing is consumed
+        names = [card.name for card in self.scheduler.upcoming(3)]
+        self.assertEqual(names, ['k9', 'k8', 'k7'])
+
+    def test_upcoming_after_updates_without_changes(self):
+        card = self.scheduler[0]
+        for _ in range(3):
+            self.scheduler.update(card)
+        names = [card.name for card in self.scheduler.upcoming(4)]
+        self.assertEqual(names, ['k9', 'k8', 'k7', 'k6'])
+
+    def test_heap_stays_bounded(self):
+        for _ in range(1000):
+            card = random.choice(self.cards)
+            card.register_review(random.random() < 0.5)
+            self.scheduler.update(card)
+            card._score_cache = None
+        self.assertLessEqual(
+            len(self.scheduler._due), 2 * len(self.cards) + 64)
+
+    def test_sample(self):
+        self.assertIn(self.scheduler.sample().name,
+                      {card.name for card in self.cards})
+        for _ in range(100):
+            self.assertNotEqual(self.scheduler.sample('k9').name, 'k9')
+        # The excluded card is picked when it is the only one
+        scheduler = Scheduler([make_card('only')])
+        self.assertEqual(scheduler.sample('only').name, 'only')
+        self.assertIsNone(Scheduler().sample())
+
+
+class WeightedSamplerTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def test_total(self):
+        sampler = WeightedSampler([('a', 1), ('b', 2), ('c', 3)])
+        self.assertEqual(sampler.total, 6)
+        sampler.set('a', 10)
+        self.assertEqual(sampler.total, 15)
+        sampler.remove('b')
+        self.assertEqual(sampler.total, 13)
+        self.assertNotIn('b', sampler)
+
+    def test_empty(self):
+        self.assertIsNone(WeightedSampler().sample())
+        self.assertIsNone(WeightedSampler([('a', 0)]).sample())
+
+    def test_zero_weight_never_drawn(self):
+        sampler = WeightedSampler([('a', 0), ('b', 1), ('c', 0)])
+        for _ in range(100):
+            self.assertEqual(sampler.sample(), 'b')
+
+    def test_exclude(self):
+        sampler = WeightedSampler([('a', 1000), ('b', 1)])
+        for _ in range(100):
+            self.assertEqual(sampler.sample('a'), 'b')
+        self.assertIsNone(WeightedSampler([('a', 1)]).sample('a'))
+        self.assertEqual(sampler.total, 1001)  # Restored after the draw
+
+    def test_proportions(self):
+        sampler = WeightedSampler([('a', 1), ('b', 3)])
+        counts = Counter(sampler.sample() for _ in range(4000))
+        self.assertAlmostEqual(counts['b'] / 4000, 0.75, delta=0.05)
+
+    def test_reused_slots(self):
+        sampler = WeightedSampler()
+        for i in range(100):
+            sampler.set('n%d' %i, 1)
+        for i in range(0, 100, 2):
+            sampler.remove('n%d' %i)
+        for i in range(100, 150):
+            sampler.set('n%d' %i, 1)
+        self.assertEqual(len(sampler), 100)
+        self.assertEqual(sampler.total, 100)
+        drawn = {sampler.sample() for _ in range(2000)}
+        self.assertTrue(drawn <= {'n%d' %i for i in range(1, 100, 2)}
+                        | {'n%d' %i for i in range(100, 150)})
+
+
+if __name__ == '__main__':
+    unittest.main()
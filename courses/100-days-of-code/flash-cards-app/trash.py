@@ -0,0 +1,131 @@
+import os
+import shutil
+import time
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Callable, NamedTuple, Union
+
+
+
+TRASH_MAX_AGE = 30 * 24 * 3600  # Seconds a deleted project is kept
+TRASH_MAX_SIZE = 1 << 30  # Bytes of deleted projects kept, oldest go first
+PURGING_SUFFIX = '.purging'
+
+
+
+class TrashEntry(NamedTuple):
+    name: str  # Folder name the project had
+    deleted: float  # Timestamp
+    path: Path
+
+
+def folder_size(path: Union[str, Path]) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                size += os.stat(os.path.join(root, file_name)).st_size
+            except FileNotFoundError:
+                pass
+    return size
+
+# Deleted project folders, moved in by renaming them (the trash is kept
+# in the projects folder, on the same file system) under a unique name
+# with their deletion time. Entries are purged in a background thread,
+# first renamed out of the trash so they can't be restored half removed
+# `release` is given each folder about to be removed, to free what it uses
+# outside of it
+class Trash:
+
+    def __init__(
+            self, path: Union[str, Path],
+            max_age: float = TRASH_MAX_AGE, max_size: int = TRASH_MAX_SIZE,
+            release: Callable[[Path], object] = None):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.max_size = max_size
+        self.release = release
+        self._lock = Lock()
+        self._purge = None
+
+    def put(self, folder: Union[str, Path]) -> TrashEntry:
+        folder = Path(folder)
+        self.path.mkdir(exist_ok=True)
+        with self._lock:
+            while True:
+                deleted = time.time_ns()
+                entry = self.path / ('%s@%d' %(folder.name, deleted))
+                if not entry.exists():
+                    break
+            os.rename(folder, entry)
+        return TrashEntry(folder.name, deleted / 1e9, entry)
+
+    def entries(self) -> list[TrashEntry]:
+        # Newest first
+        entries = []
+        try:
+            items = list(self.path.iterdir())
+        except FileNotFoundError:
+            return entries
+        for item in items:
+            if item.name.endswith(PURGING_SUFFIX) or not item.is_dir():
+                continue
+            name, _, deleted = item.name.rpartition('@')
+            if name and deleted.isdigit():
+                entries.append(TrashEntry(name, int(deleted) / 1e9, item))
+            else:  # Trashed before entries had a deletion time
+                entries.append(
+                    TrashEntry(item.name, item.stat().st_mtime, item))
+        entries.sort(key=lambda entry: entry.deleted, reverse=True)
+        return entries
+
+    def restore(
+            self, entry: TrashEntry, destination: Union[str, Path]) -> Path:
+        # Fails if the destination exists or the entry is gone
+        destination = Path(destination)
+        with self._lock:
+            if destination.exists():
+                raise FileExistsError(
+                    'Destination %s already exists' %destination)
+            os.rename(entry.path, destination)
+        return destination
+
+    def purge(self, now: float = None) -> int:
+        # Removes the entries older than `max_age`, then the oldest ones
+        # until the rest fits in `max_size`. Returns the number removed
+        now = time.time() if now is None else now
+        removed = 0
+        size = 0
+        for entry in self.entries():
+            if now - entry.deleted <= self.max_age:
+                size += folder_size(entry.path)
+                if size <= self.max_size:
+                    continue
+            with self._lock:
+                purging = entry.path.with_name(
+                    entry.path.name + PURGING_SUFFIX)
+                try:
+                    os.rename(entry.path, purging)
+                except FileNotFoundError:
+                    continue  # Restored meanwhile
+            self._remove(purging)
+            removed += 1
+        # Leftovers of an interrupted purge
+        for item in self.path.glob('*' + PURGING_SUFFIX):
+            self._remove(item)
+        return removed
+
+    def _remove(self, folder: Path):
+        if self.release is not None:
+            try:
+                self.release(folder)
+            except Exception:  # Unreadable leftovers are removed anyway
+                pass
+        shutil.rmtree(folder, ignore_errors=True)
+
+    def purge_in_background(self):
+        if self._purge is not None and self._purge.is_alive():
+            return
+        # Daemon, an unfinished purge is resumed by the next one
+        self._purge = Thread(target=self.purge, daemon=True)
+        self._purge.start()
@@ -36,6 +36,15 @@ class App:
         self.root.columnconfigure(0, weight=1)
         # Handle app destroy
         self.root.protocol('WM_DELETE_WINDOW', self.close_callback)
+        # Deferred updates
+        self._pending = {}
+        self._flush_id = None
+
+    def show_saving(self):
+        # Shown while the projects are saved, before the window goes away
+        self.root.title('Saving...')
+        self.root.configure(cursor='watch')
+        self.root.update_idletasks()
 
     def close_callback(self):
         self.root.event_generate(VEV_CLOSE_APP)
@@ -46,5 +55,17 @@ class App:
         self.root.tk.call(
             "bind", str(self.root), event, command)
 
+    def defer(self, key, callback):
+        # Updates with the same key are coalesced and run once, when idle
+        self._pending[key] = callback
+        if self._flush_id is None:
+            self._flush_id = self.root.after_idle(self._flush)
+
+    def _flush(self):
+        self._flush_id = None
+        pending, self._pending = self._pending, {}
+        for callback in pending.values():
+            callback()
+
     def run(self):
         self.root.mainloop()
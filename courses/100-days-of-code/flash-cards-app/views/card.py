@@ -3,8 +3,10 @@ import tkinter.ttk as ttk
 from tkinter.filedialog import askopenfilename
 from PIL import Image
 from PIL.ImageTk import PhotoImage
+from os import stat
 from os.path import normpath
-from model import IMG_FMTS
+from collections import OrderedDict
+from model import IMG_FMTS, IMG_VARIANTS, image_variant
 
 __all__ = ["VEV_CARD_EDIT",
            "VEV_CARD_FLIPPED",
@@ -16,8 +18,44 @@ __all__ = ["VEV_CARD_EDIT",
            "CardPopup"]
 
 
-def load_tk_photoimage(img_path):
-    return PhotoImage(Image.open(img_path))
+def load_tk_photoimage(img_path, limits=None):
+    with Image.open(img_path) as img:
+        if limits is not None:
+            img.thumbnail(limits)  # Files not stored yet may be huge
+        return PhotoImage(img)
+
+
+# Decoded images, least recently used first
+# Keyed by path and modification time, so edited files are reloaded
+class PhotoImageCache:
+
+    def __init__(self, budget=64 * 2**20):
+        self._budget = budget  # In bytes, assuming 4 bytes per pixel
+        self._size = 0
+        self._images = OrderedDict()
+
+    @staticmethod
+    def _image_size(image):
+        return image.width() * image.height() * 4
+
+    def get(self, img_path):
+        key = (img_path, stat(img_path).st_mtime_ns)
+        try:
+            self._images.move_to_end(key)
+            return self._images[key]
+        except KeyError:
+            pass
+        image = load_tk_photoimage(img_path)
+        self._images[key] = image
+        self._size += self._image_size(image)
+        while self._size > self._budget and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self._size -= self._image_size(evicted)
+        return image
+
+    def clear(self):
+        self._images.clear()
+        self._size = 0
 
 
 VEV_CARD_EDIT = '<<CardEdit>>'
@@ -49,6 +87,10 @@ class Card:
             command=self._flip_callback)
         # Working card id
         self._working_card = None
+        # Decoded images and images waiting to be prefetched
+        self._images = PhotoImageCache()
+        self._prefetch_queue = []
+        self._prefetch_id = None
         ## Image
         # Canvas widget do not keep a referente to the image object
         # A reference to the image object must be explicity created
@@ -57,6 +99,8 @@ class Card:
         self._front_img = None
         self._back_img_id = None
         self._back_img = None
+        # Window showing the full size variant of a clicked image
+        self._enlarged = None
         ## Text
         self._front_txt_id = None
         self._back_txt_id = None
@@ -127,16 +171,40 @@ class Card:
     def _set_image(self, img_path, position, which, state='normal'):
         if which == 'front':
             self._remove_images('front')
-            self._front_img = load_tk_photoimage(img_path)
+            self._front_img = self._images.get(img_path)
             self._front_img_id = self._canvas.create_image(
                 *position, anchor='center',
                 image=self._front_img, state=state)
+            img_id = self._front_img_id
         if which == 'back':
             self._remove_images('back')
-            self._back_img = load_tk_photoimage(img_path)
+            self._back_img = self._images.get(img_path)
             self._back_img_id = self._canvas.create_image(
                 *position, anchor='center',
                 image=self._back_img, state=state)
+            img_id = self._back_img_id
+        self._canvas.tag_bind(
+            img_id, '<Button-1>', lambda event: self._enlarge(img_path))
+
+    def _enlarge(self, img_path):
+        # Full size variant, not cached since it is seldom shown
+        self._close_enlarged()
+        try:
+            image = load_tk_photoimage(image_variant(img_path, 'full'))
+        except OSError:
+            return
+        self._enlarged = tk.Toplevel(self._root)
+        self._enlarged.title('Image')
+        label = ttk.Label(self._enlarged, image=image)
+        label.image = image  # Keep a reference
+        label.grid(row=0, column=0)
+        self._enlarged.bind('<Escape>', lambda event: self._close_enlarged())
+        self._enlarged.protocol('WM_DELETE_WINDOW', self._close_enlarged)
+
+    def _close_enlarged(self):
+        if self._enlarged is not None:
+            self._enlarged.destroy()
+            self._enlarged = None
 
     def set_content(
             self, card_id,
@@ -167,6 +235,23 @@ class Card:
         else:
             self._set_text('Empty...', self._center, 'back', 'hidden')
 
+    def prefetch(self, img_paths):
+        # Decode the images of the next cards one at a time, when idle
+        self._prefetch_queue = [path for path in img_paths if path]
+        if self._prefetch_id is None and self._prefetch_queue:
+            self._prefetch_id = self._root.after_idle(self._prefetch_next)
+
+    def _prefetch_next(self):
+        self._prefetch_id = None
+        if not self._prefetch_queue:
+            return
+        try:
+            self._images.get(self._prefetch_queue.pop(0))
+        except OSError:
+            pass  # It'll fail again, and be reported, if ever shown
+        if self._prefetch_queue:
+            self._prefetch_id = self._root.after_idle(self._prefetch_next)
+
     def disable_buttons(self, which='all'):
         if which == 'all':
             self._edit_btn['state'] = 'disabled'
@@ -332,6 +417,12 @@ class CardPopup:
         self._front_txt_box = tk.Text(self._frame, height=4, wrap='word')
         self._front_txt_box.grid(
             row=3, column=1, rowspan=4, columnspan=2, sticky='wnes')
+        ### Image preview
+        self._front_preview_lbl = ttk.Label(self._frame, anchor='center')
+        self._front_preview_lbl.grid(row=4, column=0, rowspan=3)
+        self._front_img_var.trace_add(
+            'write', lambda *args: self._set_preview(
+                self._front_preview_lbl, self._front_img_var.get()))
         # Card back
         self._back_section_lbl = ttk.Label(
             self._frame, text='Card back', anchor='center', padding=1)
@@ -359,6 +450,12 @@ class CardPopup:
         self._back_txt_box = tk.Text(self._frame, height=4, wrap='word')
         self._back_txt_box.grid(
             row=9, column=1, rowspan=4, columnspan=2, sticky='wnes')
+        ### Image preview
+        self._back_preview_lbl = ttk.Label(self._frame, anchor='center')
+        self._back_preview_lbl.grid(row=10, column=0, rowspan=3)
+        self._back_img_var.trace_add(
+            'write', lambda *args: self._set_preview(
+                self._back_preview_lbl, self._back_img_var.get()))
         # Warning label
         self._warning_var = tk.StringVar()
         self._warning_lbl = ttk.Label(
@@ -416,6 +513,25 @@ class CardPopup:
     def warning(self, message):
         self._warning_var.set(message)
 
+    @staticmethod
+    def _set_preview(label, img_path):
+        # Thumbnail variant of stored images, selected files are shrunk
+        try:
+            image = load_tk_photoimage(
+                image_variant(img_path.strip(), 'thumb'),
+                IMG_VARIANTS['thumb'])
+        except (OSError, ValueError, Image.DecompressionBombError):
+            image = ''
+        label.configure(image=image)
+        label.image = image  # Keep a reference
+
+    def set_pending(self, pending=True):
+        # Waiting for the card images to be processed
+        state = ['disabled'] if pending else ['!disabled']
+        self._conclude_btn.state(state)
+        self._cancel_btn.state(state)
+        self.warning("Processing images..." if pending else "")
+
     def set_content(self,
                     name='', learned=False,
                     front_img='', front_txt='',
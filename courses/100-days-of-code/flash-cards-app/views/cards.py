@@ -1,5 +1,7 @@
 import tkinter as tk
 import tkinter.ttk as ttk
+from tkinter.filedialog import askopenfilename
+from tkinter.messagebox import showinfo
 
 
 __all__ = ["VEV_CARD_SET",
@@ -8,6 +10,7 @@ __all__ = ["VEV_CARD_SET",
            "VEV_CARD_NONE",
            "VEV_CARDS_FILTERING",
            "VEV_FILTER_CATEG_SET",
+           "VEV_CARDS_IMPORT",
            "CardsSec"]
 
 
@@ -17,6 +20,7 @@ VEV_CARD_DELETE = '<<CardDelete>>'
 VEV_CARD_NONE = '<<NoWorkingCard>>'
 VEV_CARDS_FILTERING = '<<CardsFiltering>>'
 VEV_FILTER_CATEG_SET = '<<FilterCategSet>>'
+VEV_CARDS_IMPORT = '<<CardsImport>>'
 
 
 class CardsSec:
@@ -40,6 +44,18 @@ class CardsSec:
         self._cards_tree_list.heading('score', text='Score')
         self._cards_tree_list.grid(
             row=0, column=0, columnspan=4, sticky='wnes')
+        ## Virtual list mode
+        ## Only the visible rows exist in the treeview, the rest stay in the
+        ## data source and are swapped in while scrolling
+        self._source = None
+        self._offset = 0
+        self._refresh_id = None
+        self._scrollbar = ttk.Scrollbar(
+            self._inner_frame, orient='vertical',
+            command=self._scroll_handler)
+        self._cards_tree_list.bind('<Configure>', self._resize_handler)
+        for wheel_event in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self._cards_tree_list.bind(wheel_event, self._wheel_handler)
         ## Filter category
         self._filter_categ_lbl = ttk.Label(
             self._inner_frame, text='Filter ctg.', padding=1)
@@ -83,6 +99,11 @@ class CardsSec:
             command=self._delete_callback, state='disabled')
         self._delete_btn.grid(
             row=2, column=1, padx=(1, 0), pady=(2, 0), sticky='we')
+        # Button to import cards from a CSV/TSV file
+        self._import_btn = ttk.Button(
+            self._frame, text='Import', command=self._import_callback)
+        self._import_btn.grid(
+            row=3, column=0, columnspan=2, pady=(2, 0), sticky='we')
         # Needed because treeview 'loses' detached items
         self._detached_cards = []
         # Resizing/Borders
@@ -103,18 +124,119 @@ class CardsSec:
             self._root.event_generate(VEV_CARD_NONE)
         else:
             self._selected = name
-            self._cards_tree_list.item(name, tags=(self._dclick, self._slct))
+            try:  # Card may be filtered out of the list
+                self._cards_tree_list.item(
+                    name, tags=(self._dclick, self._slct))
+            except tk.TclError:
+                pass
             self._delete_btn.state(['!disabled'])
+            self.show_card(name)
             self._root.event_generate(VEV_CARD_SET, data=name)
 
     def get_working_card(self):
         return self._selected
 
+    def set_source(self, count=None, rows=None, index=None):
+        # count() -> number of cards
+        # rows(start, stop) -> [(name, score), ...] in the list order
+        # index(name) -> position of a card in the list, None if not listed
+        # Calling without arguments goes back to the regular list mode
+        self._cards_tree_list.delete(*self._detached_cards)
+        self._cards_tree_list.delete(*self._cards_tree_list.get_children())
+        self._detached_cards = []
+        self._offset = 0
+        if count is None:
+            self._source = None
+            self._scrollbar.grid_remove()
+        else:
+            self._source = (count, rows, index)
+            self._scrollbar.grid(row=0, column=4, sticky='ns')
+            self.refresh()
+
+    def is_virtual(self):
+        return self._source is not None
+
+    def _visible_rows(self):
+        try:
+            row_height = int(ttk.Style().lookup('Treeview', 'rowheight'))
+        except ValueError:
+            row_height = 20
+        height = self._cards_tree_list.winfo_height()
+        if height <= 1:  # Not mapped yet
+            return int(self._cards_tree_list['height'])
+        return max(1, height // row_height)
+
+    def refresh(self):
+        # Redrawn once per idle, no matter how many changes happened
+        if self._source is not None and self._refresh_id is None:
+            self._refresh_id = self._root.after_idle(self._redraw)
+
+    def _redraw(self):
+        self._refresh_id = None
+        if self._source is None:
+            return
+        count, rows, _ = self._source
+        total = count()
+        visible = self._visible_rows()
+        self._offset = max(0, min(self._offset, total - visible))
+        self._cards_tree_list.delete(*self._cards_tree_list.get_children())
+        for name, score in rows(self._offset, self._offset + visible):
+            tags = ((self._dclick, self._slct)
+                    if name == self._selected else (self._dclick,))
+            self._cards_tree_list.insert(
+                '', 'end', name, text=name, values=score, tags=tags)
+        if total:
+            self._scrollbar.set(self._offset / total,
+                                min(1.0, (self._offset + visible) / total))
+        else:
+            self._scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, idx):
+        self._offset = idx
+        self.refresh()
+
+    def show_card(self, name):
+        # Scrolls a virtual list to the card, if it is listed out of view
+        if self._source is None or name is None:
+            return
+        idx = self._source[2](name)
+        if idx is None:
+            return
+        if not self._offset <= idx < self._offset + self._visible_rows():
+            self.scroll_to(idx)
+
+    def _scroll_handler(self, action, amount, unit=None):
+        if self._source is None:
+            return
+        if action == 'moveto':
+            self._offset = int(float(amount) * self._source[0]())
+        elif unit == 'pages':
+            self._offset += int(amount) * self._visible_rows()
+        else:
+            self._offset += int(amount)
+        self.refresh()
+
+    def _wheel_handler(self, event):
+        if self._source is None:
+            return None
+        if event.num == 4 or event.delta > 0:
+            self._scroll_handler('scroll', -3)
+        else:
+            self._scroll_handler('scroll', 3)
+        return 'break'
+
+    def _resize_handler(self, *args):
+        self.refresh()
+
     def insert_card(self, name, score, idx='end'):
+        if self._source is not None:
+            return self.refresh()
         self._cards_tree_list.insert(
             '', idx, name, text=name, values=score, tags=(self._dclick,))
 
     def extend_cards(self, names, scores, at=None):
+        if self._source is not None:
+            return self.refresh()
         if at is None:
             for name, score in zip(names, scores):
                 self._cards_tree_list.insert(
@@ -127,12 +249,22 @@ class CardsSec:
                     text=name, values=score, tags=(self._dclick,))
                 at += 1
 
+    def move_card(self, name, score, idx):
+        if self._source is not None:
+            return self.refresh()
+        self._cards_tree_list.item(name, values=score)
+        self._cards_tree_list.move(name, '', idx)
+
     def remove_card(self, name):
+        if self._source is not None:
+            return self.refresh()
         try: self._detached_cards.remove(name)
         except ValueError: pass
         self._cards_tree_list.delete(name)
 
     def pop_card(self, idx=-1):
+        if self._source is not None:
+            return None
         try:
             cname = self._cards_tree_list.get_children()[idx]
         except IndexError:
@@ -141,7 +273,7 @@ class CardsSec:
         return cname
 
     def detach_card(self, name):
-        if name in self._detached_cards:
+        if self._source is not None or name in self._detached_cards:
             return None
         idx = self._cards_tree_list.index(name)
         self._cards_tree_list.selection_remove(name)
@@ -150,6 +282,8 @@ class CardsSec:
         return idx
 
     def detach_card_by_index(self, idx):
+        if self._source is not None:
+            return None
         try:
             name = self._cards_tree_list.get_children()[idx]
         except IndexError:
@@ -168,12 +302,19 @@ class CardsSec:
         return True
 
     def switch_card(self, name, new_idx):
+        if self._source is not None:
+            self.refresh()
+            return True
         if name in self._detached_cards:
             return False
         old_idx = self._cards_tree_list.index(name)
         return self.switch_card_by_index(old_idx, new_idx)
 
     def switch_card_by_index(self, old_idx, new_idx):
+        # Virtual lists follow the data source order, already switched
+        if self._source is not None:
+            self.refresh()
+            return True
         if old_idx == new_idx:
             return True
         min_idx, max_idx = ((old_idx, new_idx)
@@ -193,18 +334,43 @@ class CardsSec:
         self._cards_tree_list.move(cname_min, '', max_idx)
         return True
 
+    def set_cards(self, names, scores):
+        # Replace the listed cards, keeping the filter and the working card
+        if self._source is not None:
+            return self.refresh()
+        self._cards_tree_list.delete(*self._detached_cards)
+        self._cards_tree_list.delete(*self._cards_tree_list.get_children())
+        self._detached_cards = []
+        self.extend_cards(names, scores)
+        if (self._selected is not None
+                and self._cards_tree_list.exists(self._selected)):
+            self._cards_tree_list.item(
+                self._selected, tags=(self._dclick, self._slct))
+
     def remove_all_cards(self):
         self._cards_tree_list.selection_set()
         self._filter_categ_combox.set('')
         self._filter_value_combox.set('')
-        self._cards_tree_list.delete(*self._detached_cards)
-        self._cards_tree_list.delete(*self._cards_tree_list.get_children())
-        self._detached_cards = []
+        self.set_source()
         self.set_working_card()
 
     def _create_callback(self):
         self._root.event_generate(VEV_CARD_CREATE)
 
+    def _import_callback(self):
+        file_path = askopenfilename(
+            parent=self._root, title='Import cards',
+            filetypes=[('CSV/TSV files', '.csv .tsv .tab'),
+                       ('All files', '*')])
+        if file_path:
+            self._root.event_generate(VEV_CARDS_IMPORT, data=file_path)
+
+    def set_importing(self, importing=True):
+        self._import_btn.state(['disabled' if importing else '!disabled'])
+
+    def report(self, title, message):
+        showinfo(title, message, parent=self._root)
+
     def _delete_callback(self):
         if self._selected is not None:
             self._root.event_generate(VEV_CARD_DELETE, data=self._selected)
@@ -219,6 +385,12 @@ class CardsSec:
     def _filter_handler(self, *args):
         self._root.event_generate(VEV_CARDS_FILTERING)
 
+    def get_filter_category(self):
+        return self._filter_categ_var.get()
+
+    def get_filter_value(self):
+        return self._filter_value_var.get().strip()
+
     def set_filter_categories(self, categories):
         self._filter_categ_var.set('')
         self._filter_categ_combox.configure(
@@ -24,8 +24,14 @@ class ModeSec:
             variable=self._mode_var, takefocus=0,
             command=self._mode_update_callback)
         self._mode_btn.grid(row=0, column=0)
+        # Spaced repetition checkbutton, schedules the revision mode
+        self._spaced_var = tk.StringVar(value='0')
+        self._spaced_btn = ttk.Checkbutton(
+            self._frame, text='Spaced repetition',
+            variable=self._spaced_var, takefocus=0)
+        self._spaced_btn.grid(row=0, column=1)
         # Resizing/Borders
-        self._frame.columnconfigure(0, weight=1)
+        self._frame.columnconfigure((0, 1), weight=1)
         self._frame.configure(borderwidth=5, relief='groove')
 
     def _mode_update_callback(self):
@@ -40,6 +46,9 @@ class ModeSec:
     def get_mode(self):
         return 'quiz' if self._mode_var.get() == '1' else 'revision'
 
+    def get_scheduling(self):
+        return 'sm2' if self._spaced_var.get() == '1' else 'score'
+
     def set_default(self):
         self._mode_var.set('0')
         self._root.event_generate(VEV_REVISION_MODE)
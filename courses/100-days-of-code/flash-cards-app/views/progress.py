@@ -11,36 +11,37 @@ class ProgressSec:
         self._root = root
         # Section frame
         self._frame = ttk.Frame(root)
+        # Labels are updated by the setters, not by traces on their
+        # variables, so an update doesn't go through Tcl trace callbacks
         # Last studied
         self._last_studied_var = tk.StringVar()
-        self._last_studied_var.trace_add('write', self._update_last_studied)
         self._last_studied_lbl = ttk.Label(
             self._frame, text='Last studied in :', anchor='w')
         self._last_studied_lbl.grid(row=0, column=0, sticky='w')
         # Reviewed today
         self._reviewed_today_var = tk.StringVar()
-        self._reviewed_today_var.trace_add(
-            'write', self._update_reviewed_today)
         self._reviewed_today_lbl = ttk.Label(
             self._frame, text='# Cards reviewed today :', anchor='w')
         self._reviewed_today_lbl.grid(row=1, column=0, sticky='w')
         # Learned today
         self._learned_today_var = tk.StringVar()
-        self._learned_today_var.trace_add(
-            'write', self._update_learned_today)
         self._learned_today_lbl = ttk.Label(
             self._frame, text='# Cards learned today :', anchor='w')
         self._learned_today_lbl.grid(row=2, column=0, sticky='w')
+        # Due for spaced repetition
+        self._due_var = tk.StringVar()
+        self._due_lbl = ttk.Label(
+            self._frame, text='# Cards due today / this week :', anchor='w')
+        self._due_lbl.grid(row=3, column=0, sticky='w')
         # Progress bar
         self._progress_var = tk.StringVar(value='0.0')
-        self._progress_var.trace_add('write', self._update_progress)
         self._progress_lbl = ttk.Label(
             self._frame, text='Overall progress : 0.0%', anchor='w')
-        self._progress_lbl.grid(row=3, column=0, sticky='w')
+        self._progress_lbl.grid(row=4, column=0, sticky='w')
         self._progress_bar = ttk.Progressbar(
             self._frame, variable=self._progress_var,
             orient='horizontal', mode='determinate')
-        self._progress_bar.grid(row=4, column=0, sticky='we', pady=2)
+        self._progress_bar.grid(row=5, column=0, sticky='we', pady=2)
         # Resizing/Borders
         self._frame.columnconfigure(0, weight=1)
         self._frame.configure(borderwidth=5, relief='groove')
@@ -61,14 +62,21 @@ class ProgressSec:
         self._learned_today_lbl.configure(
             text='# Cards learned today : %s' %self._learned_today_var.get())
 
+    def _update_due(self, *args):
+        self._due_lbl.configure(
+            text='# Cards due today / this week : %s' %self._due_var.get())
+
     def set_progress(self, percentage):
         self._progress_var.set('%.1f' %float(percentage))
+        self._update_progress()
 
     def set_last_studied(self, datetime_str):
         self._last_studied_var.set(datetime_str)
+        self._update_last_studied()
 
     def set_today_revisions(self, num_reviewed):
         self._reviewed_today_var.set(str(num_reviewed))
+        self._update_reviewed_today()
 
     def increment_today_reviews(self, increment=1):
         num_rv = int(self._reviewed_today_var.get())
@@ -76,16 +84,32 @@ class ProgressSec:
 
     def set_today_learnings(self, num_learned):
         self._learned_today_var.set(str(num_learned))
+        self._update_learned_today()
 
     def increment_today_learnings(self, increment=1):
         num_lr = int(self._learned_today_var.get())
         self.set_today_learnings(num_lr + increment)
 
+    def set_due(self, due_today, due_week):
+        self._due_var.set('%s / %s' %(due_today, due_week))
+        self._update_due()
+
+    def update(self, stats):
+        # All the stats at once, keys as in Project.progress() with
+        # 'last_studied' already formatted
+        self.set_progress(stats['progress'])
+        self.set_last_studied(stats['last_studied'])
+        self.set_today_revisions(stats['today_revisions'])
+        self.set_today_learnings(stats['today_learnings'])
+        self.set_due(stats['due_today'], stats['due_week'])
+
     def reset(self):
         self.set_progress(0.0)
         self.set_last_studied('')
         self.set_today_revisions('')
         self.set_today_learnings('')
+        self._due_var.set('')
+        self._update_due()
 
     def _grid(self, *, row, column,
               rowspan=1, columnspan=1, sticky='', **kwargs):
@@ -1,11 +1,13 @@
 import tkinter as tk
 import tkinter.ttk as ttk
+from tkinter.messagebox import showinfo
 
 
 __all__ = ["VEV_PROJ_SET",
            "VEV_PROJ_CREATE",
            "VEV_PROJ_DELETE",
            "VEV_PROJ_NONE",
+           "VEV_PROJ_RESTORE",
            "ProjectsSec"]
 
 
@@ -13,6 +15,7 @@ VEV_PROJ_SET = '<<ProjectSet>>'
 VEV_PROJ_CREATE = '<<ProjectCreate>>'
 VEV_PROJ_DELETE = '<<ProjectDelete>>'
 VEV_PROJ_NONE = '<<NoWorkingProject>>'
+VEV_PROJ_RESTORE = '<<ProjectRestore>>'
 
 
 class ProjectsSec:
@@ -52,6 +55,12 @@ class ProjectsSec:
         self._delete_btn.grid(
             row=1, column=2, columnspan=2,
             sticky='we', padx=(1, 0), pady=(2, 0))
+        # Restore last deleted project button
+        self._restore_btn = ttk.Button(
+            self._frame, text='Restore deleted',
+            command=self._restore_callback, state='disabled')
+        self._restore_btn.grid(
+            row=2, column=0, columnspan=4, sticky='we', pady=(2, 0))
         # Resizing/Borders
         self._frame.columnconfigure((0, 1, 2, 3), weight=1, uniform=True)
         self._frame.configure(borderwidth=5, relief='groove')
@@ -129,6 +138,15 @@ class ProjectsSec:
         if selection is not None:
             self._root.event_generate(VEV_PROJ_DELETE, data=selection)
 
+    def _restore_callback(self):
+        self._root.event_generate(VEV_PROJ_RESTORE)
+
+    def set_restorable(self, restorable=True):
+        self._restore_btn.state(['!disabled'] if restorable else ['disabled'])
+
+    def report(self, title, message):
+        showinfo(title, message, parent=self._root)
+
     def _grid(self, *, row, column,
               rowspan=1, columnspan=1, sticky='', **kwargs):
         self._frame.grid(row=row, column=column, sticky=sticky,